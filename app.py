@@ -1,12 +1,35 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import json
 import io
-import base64
+import hashlib
+import time
+import copy
+import csv
+import gzip
+import mmap
 import tempfile
 import os
+import sys
 import re
-from datetime import datetime
+import string
+import sqlite3
+import threading
+import tracemalloc
+import uuid
+import weakref
+import zipfile
+import zlib
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import lru_cache, wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import chain, islice, repeat
+from xml.sax.saxutils import escape as xml_escape
 import nltk
 import textstat
 
@@ -15,16 +38,19 @@ from docx import Document
 from docx.shared import Inches, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
 from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, LongTable, TableStyle
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from reportlab.lib.units import inch
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment
-from odf.opendocument import OpenDocumentSpreadsheet
-from odf.table import Table as ODFTable, TableRow, TableCell
-from odf.text import P
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+from openpyxl.writer.excel import ExcelWriter
 
 # UI imports
 from streamlit_option_menu import option_menu
@@ -241,6 +267,629 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Record per-stage timings by default (the UI can still toggle this per run)
+TIMINGS_ENABLED = os.environ.get('DOCUCRAFT_TIMINGS', '').lower() in ('1', 'true', 'yes')
+
+# Profile memory by default (the UI can still toggle this per run)
+MEMORY_PROFILE_ENABLED = os.environ.get('DOCUCRAFT_MEMORY_PROFILE', '').lower() in ('1', 'true', 'yes')
+
+# Start with live analysis on (the UI can still toggle it per session)
+LIVE_ANALYSIS_ENABLED = os.environ.get('DOCUCRAFT_LIVE_ANALYSIS', '').lower() in ('1', 'true', 'yes')
+
+# Seconds the text must stay unchanged before live analysis re-runs the cheap detectors
+LIVE_ANALYSIS_DEBOUNCE = float(os.environ.get('DOCUCRAFT_LIVE_DEBOUNCE', 0.5))
+
+# Seconds an analysis may spend before its expensive optional strategies are skipped (0 = no limit)
+ANALYSIS_TIME_BUDGET = float(os.environ.get('DOCUCRAFT_ANALYSIS_BUDGET', 10))
+
+# StageTimings collecting for the current analysis or render, if any
+_active_timings = ContextVar('docucraft_active_timings', default=None)
+
+# AnalysisDeadline bounding the current analysis, if any
+_active_deadline = ContextVar('docucraft_active_deadline', default=None)
+
+# MemoryProfile measuring the current analysis or render, if any
+_active_memory_profile = ContextVar('docucraft_active_memory_profile', default=None)
+
+class StageTimings:
+    """Wall time, CPU time and input size of each traced pipeline stage"""
+    
+    def __init__(self):
+        self.stages = []
+        self._depth = 0
+    
+    @contextmanager
+    def activate(self):
+        """Collect traced stages run inside this block"""
+        token = _active_timings.set(self)
+        try:
+            yield self
+        finally:
+            _active_timings.reset(token)
+    
+    @contextmanager
+    def stage(self, name, input_size=None, input_unit=None):
+        # Stages are recorded in call order; depth lets nested stages be indented
+        record = {'stage': name, 'depth': self._depth,
+                  'input_size': input_size, 'input_unit': input_unit}
+        self.stages.append(record)
+        self._depth += 1
+        # Stage boundaries are where a memory profile looks for its peak
+        memory_profile = _active_memory_profile.get()
+        if memory_profile is not None:
+            memory_profile.checkpoint(name)
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            record['wall_ms'] = (time.perf_counter() - wall_start) * 1000
+            record['cpu_ms'] = (time.thread_time() - cpu_start) * 1000
+            self._depth -= 1
+            if memory_profile is not None:
+                memory_profile.checkpoint(name)
+    
+    def as_dict(self):
+        top_level = [record for record in self.stages if record['depth'] == 0]
+        return {
+            'total_wall_ms': sum(record['wall_ms'] for record in top_level),
+            'total_cpu_ms': sum(record['cpu_ms'] for record in top_level),
+            'stages': self.stages
+        }
+
+class MemoryProfile:
+    """Peak traced memory and top allocation sites of one analysis or conversion
+    
+    tracemalloc only reports the peak size, not what was allocated at the peak,
+    so a snapshot is taken at whichever traced stage boundary had the most memory
+    live; its allocation sites are reported as the top sites. Snapshots are read
+    after the memory figures and reduced to their top sites at once, and the peak
+    is reset past them, so they do not count toward the peak they explain.
+    tracemalloc traces the whole process, so allocations made by other threads
+    (such as other sessions) during the run are included. Tracing slows the run
+    down severalfold, so timings taken alongside are inflated.
+    """
+    
+    # tracemalloc is process-wide, so profiled runs take turns
+    _lock = threading.Lock()
+    
+    def __init__(self, label, input_bytes, top_n=10, frames=1):
+        self.label = label
+        self.input_bytes = input_bytes
+        self.top_n = top_n
+        self.frames = frames
+        self.result = None
+        self._baseline_bytes = 0
+        self._baseline = None
+        self._peak_bytes = 0
+        self._largest_bytes = -1
+        self._largest_top = []
+        self._largest_stage = None
+    
+    @contextmanager
+    def measure(self):
+        """Profile the block; the report is in self.result afterwards"""
+        with MemoryProfile._lock:
+            started = not tracemalloc.is_tracing()
+            if started:
+                tracemalloc.start(self.frames)
+            # The baseline snapshot stays alive for the run, so it is counted in the baseline
+            self._baseline = self._snapshot()
+            tracemalloc.reset_peak()
+            self._baseline_bytes = self._peak_bytes = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            
+            # Traced stages only run when some StageTimings is collecting
+            profile_token = _active_memory_profile.set(self)
+            timings = StageTimings() if _active_timings.get() is None else None
+            try:
+                with timings.activate() if timings is not None else nullcontext():
+                    yield self
+                self.checkpoint('end')
+            finally:
+                _active_memory_profile.reset(profile_token)
+                peak_bytes = max(self._peak_bytes, tracemalloc.get_traced_memory()[1]) - self._baseline_bytes
+                self._baseline = None
+                if started:
+                    tracemalloc.stop()
+            
+            self.result = {
+                'label': self.label,
+                'input_bytes': self.input_bytes,
+                'peak_bytes': peak_bytes,
+                'bytes_per_input_byte': peak_bytes / self.input_bytes if self.input_bytes else None,
+                'duration_ms': (time.perf_counter() - start) * 1000,
+                'snapshot_stage': self._largest_stage,
+                'top_allocations': self._largest_top
+            }
+    
+    def checkpoint(self, stage):
+        """Keep the top sites if more memory is live now than at any earlier checkpoint"""
+        current, peak = tracemalloc.get_traced_memory()
+        self._peak_bytes = max(self._peak_bytes, peak)
+        if current > self._largest_bytes:
+            self._largest_bytes = current
+            self._largest_top = self._top_allocations(self._snapshot())
+            self._largest_stage = stage
+            # The snapshot is garbage now; don't let its allocations set the peak
+            tracemalloc.reset_peak()
+    
+    def write_report(self, path):
+        """Append the report to a JSON Lines file"""
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(dict(self.result, recorded_at=datetime.now().isoformat())) + '\n')
+    
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+        ))
+    
+    def _top_allocations(self, snapshot):
+        top = []
+        for stat in snapshot.compare_to(self._baseline, 'lineno'):
+            if stat.size_diff <= 0:
+                continue
+            frame = stat.traceback[0]
+            top.append({'site': f"{os.path.basename(frame.filename)}:{frame.lineno}",
+                        'size_bytes': stat.size_diff, 'count': stat.count_diff})
+            if len(top) == self.top_n:
+                break
+        return top
+
+class AnalysisDeadline:
+    """Time budget for one analysis
+    
+    Expensive optional stages ask allow() before running. Once the budget is
+    spent they are skipped and recorded, so the analysis returns a partial
+    result on time instead of running unbounded.
+    """
+    
+    def __init__(self, budget, clock=time.perf_counter):
+        self.budget = budget
+        self._clock = clock
+        self._deadline = clock() + budget
+        self.skipped = []
+    
+    @contextmanager
+    def activate(self):
+        """Bound the stages run inside this block"""
+        token = _active_deadline.set(self)
+        try:
+            yield self
+        finally:
+            _active_deadline.reset(token)
+    
+    def remaining(self):
+        """Seconds left in the budget (negative once it is spent)"""
+        return self._deadline - self._clock()
+    
+    def allow(self, stage):
+        """Whether stage may still run; records it as skipped when it may not"""
+        if self.remaining() > 0:
+            return True
+        self.skipped.append(stage)
+        return False
+
+def deadline_allows(stage):
+    """Whether an optional stage may run under the active AnalysisDeadline; always true without one"""
+    deadline = _active_deadline.get()
+    return deadline is None or deadline.allow(stage)
+
+class AdmissionPolicy:
+    """Per-request input limits, checked before analysis
+    
+    Inputs over any limit are not refused but degraded: only a head sample is
+    analyzed, without readability or AI strategies, table rows are streamed
+    from the full text to disk and only streaming output formats are offered.
+    A limit of 0 disables that check.
+    """
+    
+    # Peak analysis memory per byte of the input string, per field separator and
+    # per line. Table cells and rows cost far more than their bytes (MemoryProfile
+    # measures 25x for prose but up to 115x for narrow two-column tables); these
+    # fit the measured peaks of prose, mixed and 2-5 column tables within +35%
+    BYTES_PER_INPUT_BYTE = 20
+    BYTES_PER_FIELD_SEPARATOR = 40
+    BYTES_PER_LINE = 500
+    FIELD_SEPARATORS = ',\t|;'
+    # Formats whose generators stream rows instead of building the document in memory
+    STREAMING_FORMATS = ['CSV', 'Excel (.xlsx)', 'ODS', 'SQLite']
+    
+    def __init__(self, max_chars, max_lines, max_memory_bytes, sample_chars):
+        self.max_chars = max_chars
+        self.max_lines = max_lines
+        self.max_memory_bytes = max_memory_bytes
+        self.sample_chars = sample_chars
+    
+    def check(self, text):
+        """Admission verdict for text: its size, estimated analysis memory and any reasons to degrade"""
+        chars = len(text)
+        lines = text.count('\n') + 1
+        # Sizing ASCII text this way avoids copying it just to count its UTF-8 bytes
+        size = chars if text.isascii() else len(text.encode('utf-8', 'surrogatepass'))
+        separators = sum(text.count(sep) for sep in self.FIELD_SEPARATORS)
+        estimated_bytes = (sys.getsizeof(text) * self.BYTES_PER_INPUT_BYTE
+                           + separators * self.BYTES_PER_FIELD_SEPARATOR + lines * self.BYTES_PER_LINE)
+        
+        reasons = []
+        if self.max_chars and chars > self.max_chars:
+            reasons.append(f"{chars:,} characters (limit {self.max_chars:,})")
+        if self.max_lines and lines > self.max_lines:
+            reasons.append(f"{lines:,} lines (limit {self.max_lines:,})")
+        if self.max_memory_bytes and estimated_bytes > self.max_memory_bytes:
+            reasons.append(f"~{estimated_bytes / 1024 / 1024:,.0f} MB estimated analysis memory "
+                           f"(limit {self.max_memory_bytes / 1024 / 1024:,.0f} MB)")
+        
+        verdict = {'degraded': bool(reasons), 'reasons': reasons, 'chars': chars, 'lines': lines,
+                   'bytes': size, 'estimated_bytes': estimated_bytes}
+        if reasons:
+            # The sample ends at a line break so no table row is cut in half
+            cut = text.rfind('\n', 0, self.sample_chars)
+            verdict['sample_chars'] = cut if cut > 0 else min(chars, self.sample_chars)
+        return verdict
+
+def _stage_input_size(args):
+    """Size of the first sized argument of a stage, as (size, unit)"""
+    for arg in args:
+        if isinstance(arg, str):
+            return len(arg), 'chars'
+        if isinstance(arg, dict) and 'rows' in arg:
+            return len(arg['rows']), 'rows'
+        if isinstance(arg, (list, tuple)):
+            return len(arg), 'items'
+    return None, None
+
+@contextmanager
+def trace_stage(name, input_size=None, input_unit=None):
+    """Time a block as a stage of the active StageTimings; a no-op when none is active"""
+    timings = _active_timings.get()
+    if timings is None:
+        yield
+        return
+    with timings.stage(name, input_size, input_unit):
+        yield
+
+def traced(name, size_arg=None):
+    """Decorator timing a method as a stage of the active StageTimings
+    
+    The input size is taken from positional argument size_arg, or from the
+    first str, table dict or list argument.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            timings = _active_timings.get()
+            # Untraced calls cost a single context variable lookup
+            if timings is None:
+                return func(self, *args, **kwargs)
+            sized = args if size_arg is None else args[size_arg:size_arg + 1]
+            with timings.stage(name, *_stage_input_size(sized)):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+class ColumnarTable:
+    """Compact column-oriented storage for detected table rows
+    
+    Each column is a typed NumPy array when every cell is an integer or float
+    whose text round-trips exactly, and is otherwise dictionary-encoded as small
+    integer codes into an array of unique strings. Iterating, indexing and
+    slicing still produce rows as lists of strings, so code written for a list
+    of rows keeps working; to_pandas() wraps the arrays without copying cells.
+    """
+    
+    INT_PATTERN = re.compile(r'(?:0|-?[1-9]\d{0,17})\Z')
+    FLOAT_PATTERN = re.compile(r'-?\d{1,15}\.\d{1,15}\Z')
+    # Rows materialized at a time while iterating
+    ITER_BLOCK_ROWS = 4096
+    
+    def __init__(self, columns, num_rows):
+        # Each column is ('int' | 'float', values) or ('dict', (codes, categories))
+        self._columns = columns
+        self._num_rows = num_rows
+    
+    @classmethod
+    def from_rows(cls, rows):
+        """Encode a rectangular list of string rows, or return None if it is not one"""
+        if not rows or not isinstance(rows, list):
+            return None
+        width = len(rows[0])
+        if width == 0:
+            return None
+        for row in rows:
+            if len(row) != width or not all(type(cell) is str for cell in row):
+                return None
+        return cls([cls._encode_column(values) for values in zip(*rows)], len(rows))
+    
+    @classmethod
+    def _encode_column(cls, values):
+        if all(cls.INT_PATTERN.match(value) for value in values):
+            return ('int', np.array([int(value) for value in values], dtype=np.int64))
+        if all(cls.FLOAT_PATTERN.match(value) and repr(float(value)) == value for value in values):
+            return ('float', np.array([float(value) for value in values], dtype=np.float64))
+        
+        index = {}
+        codes = [index.setdefault(value, len(index)) for value in values]
+        code_type = np.int8 if len(index) < 128 else np.int16 if len(index) < 32768 else np.int32
+        categories = np.empty(len(index), dtype=object)
+        categories[:] = list(index)
+        return ('dict', (np.array(codes, dtype=code_type), categories))
+    
+    @property
+    def num_columns(self):
+        return len(self._columns)
+    
+    def __len__(self):
+        return self._num_rows
+    
+    def __iter__(self):
+        for start in range(0, self._num_rows, self.ITER_BLOCK_ROWS):
+            yield from self._rows(start, start + self.ITER_BLOCK_ROWS)
+    
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._num_rows)
+            if step == 1:
+                return self._rows(start, stop)
+            return [self[i] for i in range(start, stop, step)]
+        if key < 0:
+            key += self._num_rows
+        if not 0 <= key < self._num_rows:
+            raise IndexError('table row index out of range')
+        return self._rows(key, key + 1)[0]
+    
+    def __eq__(self, other):
+        if isinstance(other, list) or hasattr(other, 'to_pandas'):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+    
+    def __repr__(self):
+        return f"ColumnarTable({self._num_rows} rows x {len(self._columns)} columns)"
+    
+    def tolist(self):
+        """Rows as a list of lists of strings"""
+        return list(self)
+    
+    def to_pandas(self, columns=None):
+        """DataFrame over the column arrays (categorical for dictionary-encoded columns)"""
+        data = {}
+        for i, (kind, values) in enumerate(self._columns):
+            if kind == 'dict':
+                codes, categories = values
+                data[i] = pd.Categorical.from_codes(codes, categories=categories)
+            else:
+                data[i] = values
+        df = pd.DataFrame(data, copy=False)
+        if columns is not None:
+            df.columns = list(columns)
+        return df
+    
+    def column_kinds(self):
+        """Inferred type of each column: 'int', 'float' or 'text'"""
+        return [kind if kind != 'dict' else 'text' for kind, _ in self._columns]
+    
+    def nbytes(self):
+        """Approximate memory held by the column arrays and unique strings"""
+        total = 0
+        for kind, values in self._columns:
+            if kind == 'dict':
+                codes, categories = values
+                total += codes.nbytes + categories.nbytes + sum(sys.getsizeof(value) for value in categories)
+            else:
+                total += values.nbytes
+        return total
+    
+    def _rows(self, start, stop):
+        columns = [self._column_strings(kind, values, start, stop) for kind, values in self._columns]
+        return [list(row) for row in zip(*columns)]
+    
+    @staticmethod
+    def _column_strings(kind, values, start, stop):
+        if kind == 'dict':
+            codes, categories = values
+            return categories[codes[start:stop]].tolist()
+        # str() of an int or a shortest-repr float reproduces the original text
+        return [str(value) for value in values[start:stop].tolist()]
+
+# Detected tables with more data rows than this are spilled to SQLite
+TABLE_SPILL_ROWS = int(os.environ.get('DOCUCRAFT_TABLE_SPILL_ROWS', 1000000))
+TABLE_SPILL_DIR = os.environ.get('DOCUCRAFT_TABLE_SPILL_DIR')
+
+class SQLiteTable:
+    """Table rows spilled to a temporary SQLite database
+    
+    Rows are inserted in batches with executemany and read back through
+    cursors with fetchmany, so a table can be far larger than memory. Like
+    ColumnarTable it iterates, indexes and slices as lists of strings. The
+    database file is deleted when the table is garbage collected.
+    """
+    
+    BATCH_ROWS = 10000
+    # Read by generators that have a bounded-memory path for huge tables
+    out_of_core = True
+    
+    def __init__(self, path, num_columns, num_rows):
+        self.path = path
+        self.num_columns = num_columns
+        self._num_rows = num_rows
+        self._columns = ', '.join(f'c{i}' for i in range(num_columns))
+        weakref.finalize(self, SQLiteTable._remove_file, path)
+    
+    @classmethod
+    def from_rows(cls, rows, num_columns, spool_dir=None, batch_rows=BATCH_ROWS):
+        """Stream an iterable of rows with num_columns cells into a new database"""
+        fd, path = tempfile.mkstemp(suffix='.sqlite', prefix='docucraft-table-', dir=spool_dir)
+        os.close(fd)
+        columns = ', '.join(f'c{i}' for i in range(num_columns))
+        placeholders = ', '.join('?' * num_columns)
+        num_rows = 0
+        connection = sqlite3.connect(path)
+        try:
+            # A scratch file: no journal, no fsync
+            connection.execute('PRAGMA journal_mode = OFF')
+            connection.execute('PRAGMA synchronous = OFF')
+            connection.execute(f'CREATE TABLE table_rows ({", ".join(f"c{i} TEXT" for i in range(num_columns))})')
+            rows = iter(rows)
+            while True:
+                batch = list(islice(rows, batch_rows))
+                if not batch:
+                    break
+                connection.executemany(f'INSERT INTO table_rows ({columns}) VALUES ({placeholders})', batch)
+                num_rows += len(batch)
+            connection.commit()
+        except BaseException:
+            connection.close()
+            cls._remove_file(path)
+            raise
+        connection.close()
+        return cls(path, num_columns, num_rows)
+    
+    @staticmethod
+    def _remove_file(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    
+    def __len__(self):
+        return self._num_rows
+    
+    def __iter__(self):
+        # Rows are inserted in order, so rowids run from 1 to num_rows
+        connection = sqlite3.connect(self.path)
+        try:
+            cursor = connection.execute(f'SELECT {self._columns} FROM table_rows ORDER BY rowid')
+            while True:
+                batch = cursor.fetchmany(self.BATCH_ROWS)
+                if not batch:
+                    break
+                for row in batch:
+                    yield list(row)
+        finally:
+            connection.close()
+    
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._num_rows)
+            if step == 1:
+                return self._rows(start, stop)
+            return [self[i] for i in range(start, stop, step)]
+        if key < 0:
+            key += self._num_rows
+        if not 0 <= key < self._num_rows:
+            raise IndexError('table row index out of range')
+        return self._rows(key, key + 1)[0]
+    
+    def __repr__(self):
+        return f"SQLiteTable({self._num_rows} rows x {self.num_columns} columns at {self.path})"
+    
+    def tolist(self):
+        """Rows as a list of lists of strings"""
+        return list(self)
+    
+    def to_pandas(self, columns=None):
+        """Load the whole table into a DataFrame"""
+        connection = sqlite3.connect(self.path)
+        try:
+            df = pd.read_sql_query(f'SELECT {self._columns} FROM table_rows ORDER BY rowid', connection)
+        finally:
+            connection.close()
+        if columns is not None:
+            df.columns = list(columns)
+        return df
+    
+    def _rows(self, start, stop):
+        if start >= stop:
+            return []
+        connection = sqlite3.connect(self.path)
+        try:
+            cursor = connection.execute(
+                f'SELECT {self._columns} FROM table_rows WHERE rowid > ? AND rowid <= ? ORDER BY rowid',
+                (start, stop))
+            return [list(row) for row in cursor]
+        finally:
+            connection.close()
+
+# Streamlit re-executes this module on every rerun, so tables kept in session
+# state may be instances of an earlier ColumnarTable class: check by duck typing
+
+def table_frame(rows, columns):
+    """DataFrame for table rows, without copying cells when they are columnar"""
+    if hasattr(rows, 'to_pandas') and len(columns) == rows.num_columns:
+        return rows.to_pandas(columns)
+    return pd.DataFrame(list(rows), columns=columns)
+
+def _json_default(value):
+    """json.dumps fallback for analysis containers"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+@lru_cache(maxsize=1)
+def _punkt_tokenizer():
+    """NLTK's English punkt sentence tokenizer, or None when the model is not installed"""
+    try:
+        return nltk.data.load('tokenizers/punkt/english.pickle')
+    except Exception:
+        pass
+    try:
+        from nltk.tokenize.punkt import PunktTokenizer
+        return PunktTokenizer('english')
+    except Exception:
+        return None
+
+class SentenceIndex:
+    """Sentence spans of a text, segmented once
+    
+    Sentences come from NLTK's punkt model when it is available, otherwise from
+    a rule-based splitter: a sentence ends at ., ! or ? (plus any closing quotes
+    or brackets) followed by whitespace, or at a blank line. Spans are (start,
+    end) character offsets with surrounding whitespace excluded.
+    """
+    
+    RULE_SENTENCE = re.compile(r'\S(?:.*?(?:[.!?]+[\'")\]]*(?=\s|\Z)|(?=\n[ \t]*\n)|\Z))', re.DOTALL)
+    
+    def __init__(self, text, use_punkt=True):
+        self.text = text
+        tokenizer = _punkt_tokenizer() if use_punkt else None
+        if tokenizer is not None:
+            spans = list(tokenizer.span_tokenize(text))
+        else:
+            spans = [match.span() for match in self.RULE_SENTENCE.finditer(text)]
+        spans = np.array(spans, dtype=np.int64).reshape(-1, 2)
+        self.starts = spans[:, 0]
+        self.ends = spans[:, 1]
+    
+    def __len__(self):
+        return len(self.starts)
+    
+    def __getitem__(self, index):
+        return self.text[self.starts[index]:self.ends[index]]
+    
+    def __iter__(self):
+        text = self.text
+        return (text[start:end] for start, end in zip(self.starts.tolist(), self.ends.tolist()))
+    
+    def between(self, start, end):
+        """Indexes of the sentences starting within text[start:end]"""
+        return range(int(np.searchsorted(self.starts, start)), int(np.searchsorted(self.starts, end)))
+    
+    def locate(self, positions):
+        """Index of the sentence containing each character position, or -1 between sentences"""
+        indexes = np.searchsorted(self.starts, positions, side='right') - 1
+        inside = (indexes >= 0) & (positions < self.ends[np.maximum(indexes, 0)])
+        return np.where(inside, indexes, -1)
+
+def iter_lines(text, separator='\n'):
+    """Lines of text (or pieces between another separator) one at a time, like a lazy str.split"""
+    start = 0
+    end = text.find(separator)
+    while end != -1:
+        yield text[start:end]
+        start = end + len(separator)
+        end = text.find(separator, start)
+    yield text[start:]
+
 class TextAnalyzer:
     """Advanced text analysis and classification"""
     
@@ -251,8 +900,95 @@ class TextAnalyzer:
         except:
             pass
     
-    def analyze_text_structure(self, text):
-        """Analyze text structure and classify content type"""
+    def analyze_text_structure(self, text, collect_timings=TIMINGS_ENABLED, time_budget=ANALYSIS_TIME_BUDGET,
+                               admission=None):
+        """Analyze text structure and classify content type
+        
+        With collect_timings, the result gains a 'timings' section breaking
+        down the time spent in each detector. With a time_budget in seconds,
+        the cheap detectors always run but the expensive AI strategies are
+        skipped once it is spent; the result is then marked 'partial' and
+        lists the 'skipped_stages'. With a degraded admission verdict from
+        AdmissionPolicy.check(), only the head sample is analyzed and the
+        result gains a 'degraded' section saying what was cut back.
+        """
+        timings = StageTimings() if collect_timings else None
+        deadline = AnalysisDeadline(time_budget) if time_budget else None
+        
+        with timings.activate() if timings else nullcontext(), deadline.activate() if deadline else nullcontext():
+            if admission and admission['degraded']:
+                result = self._analyze_degraded(text, admission)
+            else:
+                result = self._analyze_text_structure(text)
+        
+        if timings:
+            result['timings'] = timings.as_dict()
+        if deadline and deadline.skipped:
+            result['partial'] = True
+            result['skipped_stages'] = deadline.skipped
+        return result
+    
+    def _analyze_degraded(self, text, admission):
+        """Analyze an input over the admission limits from its head sample
+        
+        Structure is detected on the sample alone; a table found there is then
+        re-read from the full text straight into an SQLiteTable, and the
+        suggestions are narrowed to formats that stream their rows.
+        """
+        sample = text[:admission['sample_chars']]
+        result = self._analyze_text_structure(sample, degraded=True)
+        structure = result['structure']
+        actions = [f"Structure detected from the first {len(sample):,} of {len(text):,} characters; "
+                   "statistics cover that sample",
+                   "Readability score and AI headings and tables skipped"]
+        
+        formats = [fmt for fmt in AdmissionPolicy.STREAMING_FORMATS if fmt != 'Excel (.xlsx)']
+        table_data = structure.get('table_data', {})
+        if table_data.get('is_table'):
+            rows = self._stream_table_rows(text, table_data)
+            structure['table_data'] = dict(table_data, rows=rows, num_rows=len(rows))
+            # Other regions were only seen in the sample, so exports keep the one streamed table
+            structure['tables'] = []
+            actions.append(f"All {len(rows):,} table rows streamed from the full text to disk")
+            if result['content_type'] in ['tabular', 'mixed_tabular']:
+                formats = list(AdmissionPolicy.STREAMING_FORMATS)
+        
+        actions.append(f"Only streaming formats offered: {', '.join(formats)}")
+        result['suggestions'] = [suggestion for suggestion in result['suggestions'] if suggestion['format'] in formats]
+        result['degraded'] = {
+            'reasons': admission['reasons'],
+            'actions': actions,
+            'formats': formats,
+            'sample_chars': len(sample)
+        }
+        return result
+    
+    @traced('analyze.stream_table_rows')
+    def _stream_table_rows(self, text, table):
+        """Re-read every row of a table detected in a sample from the full text into an SQLiteTable
+        
+        Lines are visited one at a time and only rows with the table's column
+        count are kept, so memory stays flat however long the text is.
+        """
+        sep = table['separator']
+        num_columns = table['num_columns']
+        lines = (line for line in map(str.strip, iter_lines(text)) if sep in line)
+        
+        if table.get('source') == 'markdown':
+            rows = (self._split_markdown_row(line) for line in lines if not self._is_markdown_delimiter_row(line))
+        else:
+            # Quoting is sniffed from the first table lines, as the detector did for the sample
+            head = list(islice(lines, self.CSV_SNIFF_LINES))
+            dialect = self._sniff_table_dialect(head)[0] if any('"' in line for line in head) else None
+            rows = self._table_rows(chain(head, lines), sep, dialect)
+        
+        rows = (row for row in rows if len(row) == num_columns)
+        first = next(rows, None)
+        if first is not None and first != list(table['header']):
+            rows = chain([first], rows)
+        return SQLiteTable.from_rows(rows, num_columns, spool_dir=TABLE_SPILL_DIR)
+    
+    def _analyze_text_structure(self, text, degraded=False):
         if not text or not text.strip():
             return {
                 'content_type': 'empty',
@@ -264,15 +1000,17 @@ class TextAnalyzer:
         # Check if input is valid JSON first
         json_indicators = self._detect_json_structure(text)
         if json_indicators.get('is_json'):
+            stats = {
+                'words': len(text.split()),
+                'lines': len(text.strip().split('\n'))
+            }
+            if not degraded:
+                stats['readability_score'] = self._get_readability_score(text)
             return {
                 'content_type': 'json_data',
                 'structure': {
                     'json_data': json_indicators,
-                    'stats': {
-                        'words': len(text.split()),
-                        'lines': len(text.strip().split('\n')),
-                        'readability_score': self._get_readability_score(text)
-                    }
+                    'stats': stats
                 },
                 'suggestions': self._get_format_suggestions('json_data', {}),
                 'confidence': json_indicators.get('confidence', 95)
@@ -281,20 +1019,28 @@ class TextAnalyzer:
         # Basic text metrics
         lines = text.strip().split('\n')
         words = text.split()
-        sentences = text.split('.')
+        # Segmented once per document; the result carries it to the generators
+        sentences = SentenceIndex(text)
         
         # Detect potential table structure
         table_indicators = self._detect_table_structure(text)
         
-        # Detect headings and hierarchy
-        heading_structure = self._detect_headings(lines)
+        # Separate table regions; with several, the single global table mixes them up. A
+        # table already spilled to disk dominates the text, so regions are not re-read for it
+        tables = [] if getattr(table_indicators.get('rows'), 'out_of_core', False) else self._detect_tables(text)
+        table_indicators = self._primary_table(table_indicators, tables)
+        if len(tables) < 2:
+            # A single region is the detected table again; don't hold a second copy of its rows
+            tables = []
         
-        # Detect lists and bullet points
-        list_structure = self._detect_lists(lines)
+        # Detect headings, lists and data lines in one pass over the lines
+        line_classes = self._classify_lines(lines)
+        heading_structure = line_classes['headings']
+        list_structure = line_classes['lists']
         
-        # Always try AI extraction for better results
-        ai_headings = self._generate_smart_headings(text, lines) if not heading_structure else []
-        ai_tables = self._extract_potential_tables(text, lines) if not table_indicators.get('is_table') else {'is_table': False}
+        # Always try AI extraction for better results (degraded inputs skip it, see AdmissionPolicy)
+        ai_headings = self._generate_smart_headings(text, lines, sentences) if not heading_structure and not degraded else []
+        ai_tables = self._extract_potential_tables(text, line_classes['data_lines']) if not table_indicators.get('is_table') and not degraded else {'is_table': False}
         
         # Use AI results if no natural structure found
         if not heading_structure and ai_headings:
@@ -305,36 +1051,59 @@ class TextAnalyzer:
         
         # Determine primary content type
         content_type = self._classify_content_type(
-            table_indicators, heading_structure, list_structure, lines
+            table_indicators, heading_structure, list_structure, lines, line_classes
         )
         
+        # Keep detected rows column-oriented instead of as lists of str cells
+        if table_indicators.get('is_table'):
+            columnar_rows = ColumnarTable.from_rows(table_indicators.get('rows'))
+            if columnar_rows is not None:
+                table_indicators = dict(table_indicators, rows=columnar_rows)
+        
+        stats = {
+            'lines': len(lines),
+            'words': len(words),
+            'sentences': len(sentences)
+        }
+        if not degraded:
+            stats['readability_score'] = self._get_readability_score(text)
+        
         return {
             'content_type': content_type,
             'structure': {
                 'table_data': table_indicators,
+                'tables': tables,
                 'headings': heading_structure,
                 'lists': list_structure,
-                'stats': {
-                    'lines': len(lines),
-                    'words': len(words),
-                    'sentences': len(sentences),
-                    'readability_score': self._get_readability_score(text)
-                }
+                'stats': stats
             },
             'suggestions': self._get_format_suggestions(content_type, table_indicators),
-            'confidence': self._calculate_confidence(table_indicators, heading_structure, list_structure)
+            'confidence': self._calculate_confidence(table_indicators, heading_structure, list_structure),
+            'sentence_index': sentences
         }
     
+    @traced('analyze.detect_table_structure')
     def _detect_table_structure(self, text):
         """Detect if text contains tabular data"""
+        # Markdown pipe tables are recognized by their delimiter row, skipping separator scoring
+        markdown_table = self._detect_markdown_table(text)
+        if markdown_table:
+            return markdown_table
+        
         lines = [line.strip() for line in text.split('\n') if line.strip()]
         
         # Common separators for tabular data
         separators = [',', '\t', '|', ';', ':', ' - ', ' | ']
         separator_counts = {}
         
+        # Quoted fields may contain the separator, so take the delimiter from the sniffed
+        # dialect and count parsed fields rather than separator characters
+        dialect, has_header = self._sniff_table_dialect(lines) if '"' in text else (None, True)
+        if dialect is not None:
+            separators = [dialect.delimiter]
+        
         for sep in separators:
-            counts = [line.count(sep) for line in lines if sep in line]
+            counts = [count - 1 for count in self._table_field_counts([line for line in lines if sep in line], sep, dialect)]
             if counts:
                 # Check if separator count is consistent across lines
                 avg_count = sum(counts) / len(counts)
@@ -353,35 +1122,37 @@ class TextAnalyzer:
             
             table_lines = [line for line in lines if best_sep in line]
             if len(table_lines) >= 2:  # At least header + 1 data row
-                # Extract columns and rows
-                rows = []
-                for line in table_lines:
-                    row = [cell.strip() for cell in line.split(best_sep)]
-                    if len(row) > 1:  # Only include rows with multiple columns
-                        rows.append(row)
-                
-                # Validate consistent column count
-                if not rows:
-                    return {'is_table': False, 'confidence': 0}
-                
-                column_counts = [len(row) for row in rows]
-                most_common_count = max(set(column_counts), key=column_counts.count)
-                
-                # Filter rows to only include those with the most common column count
-                consistent_rows = [row for row in rows if len(row) == most_common_count]
+                # Count columns per line before splitting anything, so cells are
+                # only built for the rows that are kept
+                column_counts = Counter(self._table_field_counts(table_lines, best_sep, dialect))
+                most_common_count = max(set(column_counts), key=column_counts.__getitem__)
                 
                 # Need at least 2 consistent rows (header + data)
-                if len(consistent_rows) < 2:
+                if column_counts[most_common_count] < 2:
                     return {'is_table': False, 'confidence': 0}
                 
-                # Try to identify header (look for descriptive text vs data)
-                header = consistent_rows[0]
-                data_rows = consistent_rows[1:]
-                
                 # Validate that this looks like a real table
                 if most_common_count < 2:  # Need at least 2 columns
                     return {'is_table': False, 'confidence': 0}
                 
+                # Only keep rows with the most common column count
+                consistent_rows = (
+                    row for row in self._table_rows(table_lines, best_sep, dialect)
+                    if len(row) == most_common_count
+                )
+                
+                # Try to identify header (look for descriptive text vs data)
+                header = next(consistent_rows)
+                if not has_header and any(char.isdigit() for cell in header for char in cell):
+                    # The sniffer found no header and the first row holds numbers: keep it as data
+                    consistent_rows = chain([header], consistent_rows)
+                    header = [f"Column {i+1}" for i in range(most_common_count)]
+                if column_counts[most_common_count] - 1 > TABLE_SPILL_ROWS:
+                    # Too many rows to hold as lists of cells: stream them into SQLite
+                    data_rows = SQLiteTable.from_rows(consistent_rows, len(header), spool_dir=TABLE_SPILL_DIR)
+                else:
+                    data_rows = list(consistent_rows)
+                
                 return {
                     'is_table': True,
                     'separator': best_sep,
@@ -395,17 +1166,334 @@ class TextAnalyzer:
         
         return {'is_table': False, 'confidence': 0}
     
-    def _detect_headings(self, lines):
-        """Detect potential headings in text"""
+    # Markdown table delimiter row, e.g. | :--- | :---: | ---: |
+    MARKDOWN_DELIMITER_ROW = re.compile(r'\|?\s*:?-+:?\s*(?:\|\s*:?-+:?\s*)*\|?')
+    
+    def _is_markdown_delimiter_row(self, line):
+        """Whether a stripped line is a Markdown table delimiter row"""
+        # Checking the first character rejects almost every line before the regex runs
+        return line[:1] in ('|', ':', '-') and '|' in line and self.MARKDOWN_DELIMITER_ROW.fullmatch(line) is not None
+    
+    def _markdown_alignments(self, delimiter_row):
+        """Column alignments ('left', 'center', 'right' or None) from a delimiter row"""
+        alignments = []
+        for cell in self._split_markdown_row(delimiter_row):
+            if cell.startswith(':') and cell.endswith(':'):
+                alignments.append('center')
+            elif cell.startswith(':'):
+                alignments.append('left')
+            elif cell.endswith(':'):
+                alignments.append('right')
+            else:
+                alignments.append(None)
+        return alignments
+    
+    def _split_markdown_row(self, line):
+        """Cells of a Markdown table row, without the optional outer pipes"""
+        if line.startswith('|'):
+            line = line[1:]
+        if line.endswith('|') and not line.endswith('\\|'):
+            line = line[:-1]
+        if '\\|' in line:
+            return [cell.replace('\\|', '|').strip() for cell in re.split(r'(?<!\\)\|', line)]
+        return [cell.strip() for cell in line.split('|')]
+    
+    @traced('analyze.detect_markdown_table')
+    def _detect_markdown_table(self, text):
+        """Recognize Markdown pipe tables (header, delimiter row, body rows)
+        
+        Returns the largest table with its column alignments, or None if the
+        text has no Markdown table.
+        """
+        best = None
+        previous = ''
+        lines = iter(text.split('\n'))
+        for line in lines:
+            line = line.strip()
+            if not ('|' in previous and self._is_markdown_delimiter_row(line)):
+                previous = line
+                continue
+            
+            alignments = self._markdown_alignments(line)
+            header = self._split_markdown_row(previous)
+            if len(header) != len(alignments):
+                previous = line
+                continue
+            
+            # Body rows run until a blank line or a line without pipes; like
+            # GitHub Markdown, short rows are padded and extra cells dropped
+            num_columns = len(header)
+            rows = []
+            previous = ''
+            for line in lines:
+                line = line.strip()
+                if '|' not in line:
+                    previous = line
+                    break
+                cells = self._split_markdown_row(line)
+                rows.append(cells[:num_columns] + [''] * (num_columns - len(cells)))
+            
+            if rows and (best is None or len(rows) > best['num_rows']):
+                best = {
+                    'is_table': True,
+                    'separator': '|',
+                    'header': header,
+                    'rows': rows,
+                    'num_columns': num_columns,
+                    'num_rows': len(rows),
+                    'alignments': alignments,
+                    'confidence': 100,
+                    'source': 'markdown'
+                }
+        return best
+    
+    # Bounded sample used to sniff the CSV dialect of quoted tables
+    CSV_SNIFF_LINES = 50
+    CSV_DELIMITERS = ',\t;|'
+    
+    def _sniff_table_dialect(self, lines):
+        """Sniff delimiter, quoting, escaping and header presence from the first lines
+        
+        Returns (dialect, has_header), or (None, True) if the sample is not CSV-like.
+        """
+        sample = '\n'.join(islice(lines, self.CSV_SNIFF_LINES))
+        sniffer = csv.Sniffer()
+        try:
+            dialect = sniffer.sniff(sample, delimiters=self.CSV_DELIMITERS)
+        except csv.Error:
+            return None, True
+        
+        # The sniffer only reports doubled quotes it has seen; prefer them unless
+        # the sample shows backslash-escaped quotes
+        if '\\' + dialect.quotechar in sample:
+            dialect.doublequote = False
+            dialect.escapechar = '\\'
+        else:
+            dialect.doublequote = True
+        
+        try:
+            has_header = sniffer.has_header(sample)
+        except csv.Error:
+            has_header = True
+        return dialect, has_header
+    
+    def _table_field_counts(self, lines, sep, dialect=None):
+        """Number of fields on each table line"""
+        if dialect is not None:
+            return (len(self._parse_table_line(line, sep, dialect)) for line in lines)
+        return (line.count(sep) + 1 for line in lines)
+    
+    def _table_rows(self, lines, sep, dialect=None):
+        """Stripped cells of each table line, parsed by the csv reader when a dialect was sniffed"""
+        if dialect is not None:
+            return ([cell.strip() for cell in self._parse_table_line(line, sep, dialect)] for line in lines)
+        return ([cell.strip() for cell in line.split(sep)] for line in lines)
+    
+    def _parse_table_line(self, line, sep, dialect):
+        """Fields of one line in the sniffed dialect
+        
+        Each line gets its own reader so a stray quote cannot swallow the lines
+        after it; lines the csv module rejects are split on the separator.
+        """
+        try:
+            return next(csv.reader([line], dialect, delimiter=sep), [])
+        except csv.Error:
+            return line.split(sep)
+    
+    def _split_fields(self, line, sep):
+        """Split one line into stripped cells, keeping quoted separators inside their cell"""
+        if '"' in line and len(sep) == 1:
+            return [cell.strip() for cell in next(csv.reader([line], delimiter=sep, skipinitialspace=True), [])]
+        return [cell.strip() for cell in line.split(sep)]
+    
+    # Separators that can delimit a table region, highest priority first
+    TABLE_REGION_SEPARATORS = ['\t', '|', ',', ';']
+    @traced('analyze.detect_tables')
+    def _detect_tables(self, text):
+        """Find every contiguous table region in one pass over the lines
+        
+        A region is a run of consecutive lines that split into the same number
+        of columns on some separator. All separators present on the first line
+        are tracked as candidates and narrowed as lines are added, so each line
+        is examined once. A pipe header followed by a matching Markdown
+        delimiter row starts a Markdown table, whose body runs to the first
+        line without a pipe and is split like _detect_markdown_table (escaped
+        pipes kept, short rows padded). A headerless region with the same shape as the table
+        before it (rows continued under a new section heading) is merged into
+        that table. Regions over TABLE_SPILL_ROWS rows are spilled to SQLite like
+        detected tables. Returns a list of tables with 1-based line spans.
+        """
+        tables = []
+        run_lines = []        # stripped lines of the current region
+        run_candidates = {}   # separator -> column count still consistent with the region
+        run_start = 0
+        run_alignments = None  # from a Markdown delimiter row under the region's header
+        
+        for line_number, line in enumerate(text.split('\n'), 1):
+            line = line.strip()
+            if run_lines and '|' in run_candidates and self._is_markdown_delimiter_row(line):
+                # Delimiter rows belong to pipe tables but carry alignments, not cells
+                if len(run_lines) == 1:
+                    run_alignments = self._markdown_alignments(line)
+                    if len(run_alignments) == len(self._split_markdown_row(run_lines[0])):
+                        run_candidates = {'|': len(run_alignments)}
+                    else:
+                        run_alignments = None
+                continue
+            
+            if run_alignments is not None and '|' in line:
+                # Markdown body rows may be short or hold escaped pipes
+                run_lines.append(line)
+                continue
+            
+            counts = {}
+            if line:
+                for sep in self.TABLE_REGION_SEPARATORS:
+                    if sep in line:
+                        counts[sep] = self._split_table_line(line, sep, count_only=True)
+            
+            if run_lines:
+                survivors = {sep: columns for sep, columns in run_candidates.items() if counts.get(sep) == columns}
+                if survivors:
+                    run_candidates = survivors
+                    run_lines.append(line)
+                    continue
+                self._close_table_region(tables, run_lines, run_candidates, run_start, line_number - 1, run_alignments)
+                run_lines, run_candidates, run_alignments = [], {}, None
+            
+            candidates = {sep: columns for sep, columns in counts.items() if columns >= 2}
+            if candidates:
+                run_lines, run_candidates, run_start = [line], candidates, line_number
+        
+        if run_lines:
+            self._close_table_region(tables, run_lines, run_candidates, run_start, line_number, run_alignments)
+        
+        for table in tables:
+            table['rows'] = ColumnarTable.from_rows(table['rows']) or table['rows']
+        return tables
+    
+    def _primary_table(self, table_indicators, tables):
+        """The table the content is classified by: the largest region when there are several"""
+        if len(tables) > 1:
+            return max(tables, key=lambda table: len(table['rows']))
+        return table_indicators
+    
+    def _close_table_region(self, tables, lines, candidates, start, end, alignments=None):
+        """Append a finished region to tables, or extend the previous table with it"""
+        sep = next(sep for sep in self.TABLE_REGION_SEPARATORS if sep in candidates)
+        if alignments is not None:
+            num_columns = len(alignments)
+            rows = (cells[:num_columns] + [''] * (num_columns - len(cells))
+                    for cells in map(self._split_markdown_row, lines))
+        else:
+            rows = (self._split_table_line(line, sep) for line in lines)
+        header = next(rows)
+        
+        previous = tables[-1] if tables else None
+        if (alignments is None and previous and previous['separator'] == sep and previous['num_columns'] == len(header)
+                and any(char.isdigit() for cell in header for char in cell)):
+            # Headers rarely hold numbers, so this is more data for the previous table
+            num_rows = previous['num_rows'] + len(lines)
+            if num_rows > TABLE_SPILL_ROWS:
+                previous['rows'] = SQLiteTable.from_rows(chain(previous['rows'], [header], rows), len(header),
+                                                         spool_dir=TABLE_SPILL_DIR)
+            else:
+                previous['rows'].append(header)
+                previous['rows'].extend(rows)
+            previous['num_rows'] = num_rows
+            previous['span'] = (previous['span'][0], end)
+            return
+        
+        if len(lines) < 2:
+            return
+        if len(lines) - 1 > TABLE_SPILL_ROWS:
+            rows = SQLiteTable.from_rows(rows, len(header), spool_dir=TABLE_SPILL_DIR)
+        else:
+            rows = list(rows)
+        table = {
+            'is_table': True,
+            'separator': sep,
+            'header': header,
+            'rows': rows,
+            'num_columns': len(header),
+            'num_rows': len(lines) - 1,
+            'confidence': 100,
+            'source': 'region',
+            'span': (start, end)
+        }
+        if alignments is not None:
+            table['alignments'] = alignments
+        tables.append(table)
+    
+    def _split_table_line(self, line, sep, count_only=False):
+        """Cells of a table line (or just their count); pipe tables may have outer pipes"""
+        if sep == '|':
+            line = line.strip('|')
+            if count_only:
+                return line.count(sep) + 1
+            return [cell.strip() for cell in line.split(sep)]
+        if count_only and '"' not in line:
+            return line.count(sep) + 1
+        cells = self._split_fields(line, sep)
+        return len(cells) if count_only else cells
+    
+    # List item patterns, each tried only on lines starting with a matching character
+    BULLET_ITEM = re.compile(r'[-*+]\s+(.+)')
+    NUMBERED_ITEM = re.compile(r'\d+\.\s+(.+)')
+    LETTERED_ITEM = re.compile(r'[a-zA-Z]\.\s+(.+)')
+    PARENTHETICAL_ITEM = re.compile(r'\(\d+\)\s+(.+)')
+    
+    @traced('analyze.classify_lines')
+    def _classify_lines(self, lines):
+        """Classify every line in a single pass
+        
+        Each stripped line is dispatched once on its first character. Returns the
+        heading candidates, list runs, data-like lines and line length stats that
+        the heading, list, table extraction and content type detectors read.
+        """
         headings = []
+        lists = []
+        current_list = None
+        data_lines = []
+        non_empty_lines = 0
+        long_lines = 0
         
         for i, line in enumerate(lines):
             line = line.strip()
             if not line:
+                if current_list:
+                    lists.append(current_list)
+                    current_list = None
                 continue
-                
-            # Check for markdown-style headings
-            if line.startswith('#'):
+            
+            non_empty_lines += 1
+            if len(line) > 50:
+                long_lines += 1
+            
+            first = line[0]
+            
+            # List items: bullets, numbers, letters and parenthetical numbers
+            if first in '-*+':
+                match, list_type = self.BULLET_ITEM.match(line), 'bullet'
+            elif first.isdecimal():
+                match, list_type = self.NUMBERED_ITEM.match(line), 'numbered'
+            elif first == '(':
+                match, list_type = self.PARENTHETICAL_ITEM.match(line), 'numbered'
+            elif first in string.ascii_letters:
+                match, list_type = self.LETTERED_ITEM.match(line), 'numbered'
+            else:
+                match = None
+            if match:
+                if not current_list:
+                    current_list = {
+                        'type': list_type,
+                        'items': [],
+                        'start_line': i
+                    }
+                current_list['items'].append(match.group(1))
+            
+            # Headings: markdown, title case or all caps; Markdown table rows never are
+            if first == '#':
                 level = len(line) - len(line.lstrip('#'))
                 heading_text = line.lstrip('# ').strip()
                 headings.append({
@@ -414,8 +1502,8 @@ class TextAnalyzer:
                     'line_number': i,
                     'type': 'markdown'
                 })
-            
-            # Check for title case and short lines (potential headings)
+            elif first == '|':
+                pass
             elif (line.istitle() and len(line.split()) <= 8 and 
                   len(line) < 100 and not line.endswith('.')):
                 headings.append({
@@ -424,8 +1512,6 @@ class TextAnalyzer:
                     'line_number': i,
                     'type': 'title_case'
                 })
-            
-            # Check for all caps (potential headings)
             elif (line.isupper() and len(line.split()) <= 6 and 
                   len(line) < 80 and not line.endswith('.')):
                 headings.append({
@@ -434,53 +1520,30 @@ class TextAnalyzer:
                     'line_number': i,
                     'type': 'uppercase'
                 })
-        
-        return headings
-    
-    def _detect_lists(self, lines):
-        """Detect list structures in text"""
-        lists = []
-        current_list = None
-        
-        list_patterns = [
-            r'^\s*[-*+]\s+(.+)',  # Bullet points
-            r'^\s*\d+\.\s+(.+)',  # Numbered lists
-            r'^\s*[a-zA-Z]\.\s+(.+)',  # Lettered lists
-            r'^\s*\(\d+\)\s+(.+)',  # Parenthetical numbers
-        ]
-        
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if not line:
-                if current_list:
-                    lists.append(current_list)
-                    current_list = None
-                continue
             
-            for pattern in list_patterns:
-                match = re.match(pattern, line)
-                if match:
-                    if not current_list:
-                        current_list = {
-                            'type': 'bullet' if pattern.startswith(r'^\s*[-*+]') else 'numbered',
-                            'items': [],
-                            'start_line': i
-                        }
-                    current_list['items'].append(match.group(1))
-                    break
+            # Data lines feed table extraction from unstructured text
+            if self._looks_like_data_line(line):
+                data_lines.append(line)
         
         if current_list:
             lists.append(current_list)
         
-        return lists
+        return {
+            'headings': headings,
+            'lists': lists,
+            'data_lines': data_lines,
+            'non_empty_lines': non_empty_lines,
+            'long_lines': long_lines
+        }
     
-    def _generate_smart_headings(self, text, lines):
+    @traced('analyze.generate_smart_headings')
+    def _generate_smart_headings(self, text, lines, sentences):
         """Generate intelligent headings from unstructured text"""
         headings = []
         paragraphs = text.split('\n\n')
         
         # Strategy 1: Detect topic-based sections in dense text
-        dense_sections = self._extract_dense_text_sections(text)
+        dense_sections = self._extract_dense_text_sections(text) if deadline_allows('analyze.smart_headings.dense_sections') else []
         if dense_sections:
             for section in dense_sections:
                 headings.append({
@@ -492,17 +1555,20 @@ class TextAnalyzer:
                 })
         
         # Strategy 2: Use first sentence of each paragraph as potential heading
-        if not headings:
+        if not headings and deadline_allows('analyze.smart_headings.first_sentences'):
+            paragraph_start = 0
             for i, paragraph in enumerate(paragraphs):
+                paragraph_end = paragraph_start + len(paragraph)
+                sentences_in_para = sentences.between(paragraph_start, paragraph_end)
+                paragraph_start = paragraph_end + len('\n\n')
+                
                 para = paragraph.strip()
-                if not para:
+                if not para or not sentences_in_para:
                     continue
                     
-                sentences_in_para = [s.strip() for s in para.split('.') if s.strip()]
-                if not sentences_in_para:
+                first_sentence = sentences[sentences_in_para[0]].rstrip('.').strip()
+                if not first_sentence:
                     continue
-                    
-                first_sentence = sentences_in_para[0]
                 
                 # Check if first sentence could be a heading
                 if self._could_be_heading(first_sentence, para):
@@ -517,7 +1583,7 @@ class TextAnalyzer:
                     })
         
         # Strategy 3: Create section headings based on content analysis
-        if not headings and len(paragraphs) > 2:
+        if not headings and len(paragraphs) > 2 and deadline_allows('analyze.smart_headings.content_themes'):
             # Analyze content for themes and create headings
             content_sections = self._analyze_content_themes(paragraphs)
             for section in content_sections:
@@ -530,7 +1596,7 @@ class TextAnalyzer:
                 })
         
         # Strategy 4: Create basic structure for simple text
-        if not headings:
+        if not headings and deadline_allows('analyze.smart_headings.basic_structure'):
             # Create a main heading from first meaningful line
             meaningful_lines = [line.strip() for line in lines if len(line.strip()) > 10]
             if meaningful_lines:
@@ -568,62 +1634,64 @@ class TextAnalyzer:
         
         return headings
     
+    @traced('analyze.extract_dense_text_sections')
     def _extract_dense_text_sections(self, text):
         """Extract logical sections from dense, data-heavy text"""
         sections = []
         
-        # Look for different data themes in logistics/warehouse text
+        # Look for different data themes in logistics/warehouse text; gaps between
+        # keywords are bounded so a search cannot go quadratic on one huge line
         section_patterns = [
             {
-                'pattern': r'warehouse\s+received.*?units?\s+of\s+product',
+                'pattern': r'warehouse\s+received.{0,200}?units?\s+of\s+product',
                 'heading': 'Incoming Inventory',
                 'level': 2,
                 'confidence': 0.8
             },
             {
-                'pattern': r'temperature.*?recorded|registered.*?°C',
+                'pattern': r'temperature.{0,200}?recorded|registered.{0,200}?°C',
                 'heading': 'Temperature Monitoring',
                 'level': 2,
                 'confidence': 0.8
             },
             {
-                'pattern': r'damaged\s+cartons?.*?units?\s+lost',
+                'pattern': r'damaged\s+cartons?.{0,200}?units?\s+lost',
                 'heading': 'Damage Assessment',
                 'level': 2,
                 'confidence': 0.8
             },
             {
-                'pattern': r'inventory\s+tracking.*?dispatched.*?distribution\s+centers',
+                'pattern': r'inventory\s+tracking.{0,200}?dispatched.{0,200}?distribution\s+centers',
                 'heading': 'Distribution Summary',
                 'level': 2,
                 'confidence': 0.8
             },
             {
-                'pattern': r'outbound\s+delivery.*?GPS\s+pings',
+                'pattern': r'outbound\s+delivery.{0,200}?GPS\s+pings',
                 'heading': 'Delivery Operations',
                 'level': 2,
                 'confidence': 0.8
             },
             {
-                'pattern': r'power\s+outage.*?temperature\s+spike',
+                'pattern': r'power\s+outage.{0,200}?temperature\s+spike',
                 'heading': 'Incident Report',
                 'level': 2,
                 'confidence': 0.8
             },
             {
-                'pattern': r'customer\s+complaints.*?CRM\s+system',
+                'pattern': r'customer\s+complaints.{0,200}?CRM\s+system',
                 'heading': 'Customer Service Issues',
                 'level': 2,
                 'confidence': 0.8
             },
             {
-                'pattern': r'staff\s+shift\s+logs.*?workers?.*?shift',
+                'pattern': r'staff\s+shift\s+logs.{0,200}?workers?.{0,200}?shift',
                 'heading': 'Staffing Report',
                 'level': 2,
                 'confidence': 0.8
             },
             {
-                'pattern': r'fuel\s+consumption.*?liters',
+                'pattern': r'fuel\s+consumption.{0,200}?liters',
                 'heading': 'Fuel Usage',
                 'level': 2,
                 'confidence': 0.8
@@ -632,6 +1700,9 @@ class TextAnalyzer:
         
         # Check which patterns exist in the text
         for pattern_info in section_patterns:
+            # Each search may scan the whole text, so stop when the budget runs out
+            if not deadline_allows('analyze.extract_dense_text_sections'):
+                break
             if re.search(pattern_info['pattern'], text, re.IGNORECASE):
                 sections.append({
                     'heading': pattern_info['heading'],
@@ -779,19 +1850,13 @@ class TextAnalyzer:
                 return i
         return 0
     
-    def _extract_potential_tables(self, text, lines):
-        """Extract potential tabular data from unstructured text"""
-        # Strategy 1: Look for lists of similar structured data
-        structured_lines = []
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Check if line contains multiple pieces of structured data
-            if self._looks_like_data_line(line):
-                structured_lines.append(line)
+    @traced('analyze.extract_potential_tables')
+    def _extract_potential_tables(self, text, structured_lines):
+        """Extract potential tabular data from unstructured text
         
+        structured_lines are the stripped lines that look like data, in order.
+        """
+        # Strategy 1: Look for lists of similar structured data
         # If we found enough structured lines, create a table
         if len(structured_lines) >= 3:
             table_data = self._convert_to_table_structure(structured_lines)
@@ -822,7 +1887,7 @@ class TextAnalyzer:
             }
         
         # Strategy 3: Extract structured data from dense text
-        dense_data = self._extract_dense_data_patterns(text)
+        dense_data = self._extract_dense_data_patterns(text) if deadline_allows('analyze.extract_dense_data_patterns') else None
         if dense_data and len(dense_data['rows']) >= 3:
             return {
                 'is_table': True,
@@ -837,6 +1902,7 @@ class TextAnalyzer:
         
         return {'is_table': False, 'confidence': 0}
     
+    @traced('analyze.extract_dense_data_patterns')
     def _extract_dense_data_patterns(self, text):
         """Extract structured data from dense, fact-filled text"""
         # Look for patterns like warehouse/logistics data
@@ -957,11 +2023,16 @@ class TextAnalyzer:
         
         return None
     
+    # Percentages, currency, decimals, years and email-like values, as one alternation
+    DATA_VALUE = re.compile(r'\d+%|\$\d+|\d+\.\d+|\d{4}|\w+@\w+')
+    
     def _looks_like_data_line(self, line):
         """Check if a line looks like it contains structured data"""
         # Contains numbers and text
-        has_numbers = any(char.isdigit() for char in line)
-        has_text = any(char.isalpha() for char in line)
+        has_numbers = any(map(str.isdigit, line))
+        if not has_numbers:
+            return False
+        has_text = any(map(str.isalpha, line))
         
         if not (has_numbers and has_text):
             return False
@@ -975,16 +2046,7 @@ class TextAnalyzer:
             return True
             
         # Contains common data patterns
-        data_patterns = [
-            r'\d+%',  # Percentages
-            r'\$\d+',  # Currency
-            r'\d+\.\d+',  # Decimals
-            r'\d{4}',  # Years
-            r'\w+@\w+',  # Email-like
-        ]
-        
-        pattern_matches = sum(1 for pattern in data_patterns if re.search(pattern, line))
-        return pattern_matches >= 1
+        return self.DATA_VALUE.search(line) is not None
     
     def _convert_to_table_structure(self, structured_lines):
         """Convert structured lines into table format"""
@@ -997,7 +2059,7 @@ class TextAnalyzer:
             column_counts = []
             
             for line in structured_lines:
-                parts = [part.strip() for part in line.split(sep) if part.strip()]
+                parts = [part for part in self._split_fields(line, sep) if part]
                 if len(parts) >= 2:
                     split_lines.append(parts)
                     column_counts.append(len(parts))
@@ -1027,6 +2089,7 @@ class TextAnalyzer:
         
         return None
     
+    @traced('analyze.extract_key_value_pairs')
     def _extract_key_value_pairs(self, text):
         """Extract key-value pairs from text"""
         pairs = []
@@ -1053,12 +2116,13 @@ class TextAnalyzer:
         
         return pairs
     
-    def _classify_content_type(self, table_indicators, heading_structure, list_structure, lines):
+    @traced('analyze.classify_content_type', size_arg=3)
+    def _classify_content_type(self, table_indicators, heading_structure, list_structure, lines, line_classes):
         """Classify the primary content type"""
         
         # Count total text vs table content
         total_lines = len(lines)
-        non_empty_lines = len([line for line in lines if line.strip()])
+        non_empty_lines = line_classes['non_empty_lines']
         table_lines = 0
         if table_indicators.get('is_table'):
             table_lines = len(table_indicators.get('rows', [])) + 1  # +1 for header
@@ -1069,7 +2133,7 @@ class TextAnalyzer:
         text_indicators = 0
         text_indicators += len(heading_structure) * 2  # Headings are strong text indicators
         text_indicators += sum(len(lst['items']) for lst in list_structure)  # List items
-        text_indicators += len([line for line in lines if len(line.strip()) > 50])  # Long text lines
+        text_indicators += line_classes['long_lines']  # Long text lines
         
         # Strong document structure (prioritize over table signals when we have rich text structure)
         if (len(heading_structure) >= 3 or 
@@ -1103,6 +2167,7 @@ class TextAnalyzer:
         else:
             return 'narrative_document'
     
+    @traced('analyze.readability_score')
     def _get_readability_score(self, text):
         """Get readability score using textstat"""
         try:
@@ -1110,6 +2175,7 @@ class TextAnalyzer:
         except:
             return 50  # Default moderate score
     
+    @traced('analyze.format_suggestions', size_arg=1)
     def _get_format_suggestions(self, content_type, table_indicators):
         """Suggest best formats based on content analysis"""
         suggestions = []
@@ -1130,6 +2196,11 @@ class TextAnalyzer:
                 {'format': 'CSV', 'score': 90, 'reason': 'Clean data export, widely compatible'},
                 {'format': 'ODS', 'score': 85, 'reason': 'Open standard for spreadsheets'}
             ]
+            # Large tables are faster to write, open and query as a database
+            if table_indicators.get('num_rows', 0) >= 100000:
+                suggestions.append({'format': 'SQLite', 'score': 97, 'reason': 'Queryable database, far quicker than a spreadsheet for large tables'})
+            else:
+                suggestions.append({'format': 'SQLite', 'score': 75, 'reason': 'Queryable database file for SQL analysis'})
         
         elif content_type == 'mixed_tabular':
             # Adjust scores based on how much is actually tabular
@@ -1156,6 +2227,7 @@ class TextAnalyzer:
         
         return sorted(suggestions, key=lambda x: x['score'], reverse=True)
     
+    @traced('analyze.calculate_confidence')
     def _calculate_confidence(self, table_indicators, heading_structure, list_structure):
         """Calculate overall confidence in content classification"""
         confidence_factors = []
@@ -1180,6 +2252,7 @@ class TextAnalyzer:
         
         return min(sum(confidence_factors) / len(confidence_factors), 95)
     
+    @traced('analyze.detect_json_structure')
     def _detect_json_structure(self, text):
         """Detect if the input text is valid JSON"""
         try:
@@ -1223,10 +2296,313 @@ class TextAnalyzer:
                 'value_type': type(json_obj).__name__
             }
 
+class LiveAnalysis:
+    """Cheap detectors re-run as the text is edited, for live analysis
+    
+    Only the JSON, table, heading and list detectors and the content type
+    classifier run; the AI strategies, readability and sentence statistics
+    wait for a full analysis. Lines are classified per block of non-blank
+    lines (no list runs across a blank line), and the leading blocks that
+    match the previous text reuse its classifications, so typing at the end
+    of a document only reclassifies the block being edited. The table
+    detectors only re-run when the lines they read have changed.
+    """
+    
+    # Separators the table detectors split on; other lines only end a table run
+    TABLE_LINE_MARKERS = (',', '\t', '|', ';', ':', ' - ')
+    
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+        # (block lines, line classes relative to the block) of the previous text
+        self._blocks = []
+        # Table lines of the previous text and the table detected in them
+        self._table_lines = None
+        self._table = None
+    
+    def summarize(self, text):
+        """Content type, table separator and heading and list counts of text, with the time taken"""
+        start = time.perf_counter()
+        analyzer = self.analyzer
+        summary = {'separator': None, 'headings': 0, 'lists': 0, 'list_items': 0, 'reused_lines': 0}
+        
+        if analyzer._detect_json_structure(text).get('is_json'):
+            summary['content_type'] = 'json_data'
+        else:
+            lines = text.strip().split('\n')
+            line_classes, summary['reused_lines'] = self._classify_lines(lines)
+            table_indicators = self._detect_table(text)
+            
+            summary.update(
+                content_type=analyzer._classify_content_type(
+                    table_indicators, line_classes['headings'], line_classes['lists'], lines, line_classes),
+                separator=table_indicators.get('separator') if table_indicators.get('is_table') else None,
+                headings=len(line_classes['headings']),
+                lists=len(line_classes['lists']),
+                list_items=sum(len(lst['items']) for lst in line_classes['lists'])
+            )
+        
+        summary['latency_ms'] = (time.perf_counter() - start) * 1000
+        return summary
+    
+    def _detect_table(self, text):
+        """The table the full analysis would classify text by, reused while its table lines are unchanged"""
+        table_lines = self._table_fingerprint(text)
+        if table_lines == self._table_lines:
+            return self._table
+        
+        table = self.analyzer._primary_table(self.analyzer._detect_table_structure(text),
+                                             self.analyzer._detect_tables(text))
+        
+        # Only the row count is read, so the cells are not kept between edits
+        self._table_lines = table_lines
+        self._table = dict(table, rows=range(len(table.get('rows', ()))))
+        return self._table
+    
+    def _table_fingerprint(self, text):
+        """The stripped lines the table detectors read, with each run of other lines as one break"""
+        if '"' in text:
+            # Quoted tables are sniffed from a sample of every line
+            return text
+        fingerprint = []
+        for line in text.split('\n'):
+            line = line.strip()
+            if any(marker in line for marker in self.TABLE_LINE_MARKERS):
+                fingerprint.append(line)
+            elif fingerprint and fingerprint[-1] is not None:
+                fingerprint.append(None)
+        return fingerprint
+    
+    def _classify_lines(self, lines):
+        """TextAnalyzer._classify_lines over lines, block by block
+        
+        Returns the merged line classes and the number of lines whose
+        classification was reused from the previous text.
+        """
+        blocks = []
+        block_start = None
+        for i, line in enumerate(chain(lines, [''])):
+            if line.strip():
+                if block_start is None:
+                    block_start = i
+            elif block_start is not None:
+                blocks.append((block_start, lines[block_start:i]))
+                block_start = None
+        
+        merged = {'headings': [], 'lists': [], 'data_lines': [], 'non_empty_lines': 0, 'long_lines': 0}
+        classified = []
+        reused_lines = 0
+        reusing = True
+        for index, (offset, block_lines) in enumerate(blocks):
+            if reusing and index < len(self._blocks) and self._blocks[index][0] == block_lines:
+                classes = self._blocks[index][1]
+                reused_lines += len(block_lines)
+            else:
+                reusing = False
+                classes = self.analyzer._classify_lines(block_lines)
+            classified.append((block_lines, classes))
+            
+            merged['headings'].extend(dict(heading, line_number=heading['line_number'] + offset)
+                                      for heading in classes['headings'])
+            merged['lists'].extend(dict(lst, start_line=lst['start_line'] + offset) for lst in classes['lists'])
+            merged['data_lines'].extend(classes['data_lines'])
+            merged['non_empty_lines'] += classes['non_empty_lines']
+            merged['long_lines'] += classes['long_lines']
+        
+        self._blocks = classified
+        return merged, reused_lines
+
+# Timestamp stamped into reproducible output (honours SOURCE_DATE_EPOCH)
+REPRODUCIBLE_TIMESTAMP = (datetime.fromtimestamp(int(os.environ['SOURCE_DATE_EPOCH']), timezone.utc).replace(tzinfo=None)
+                          if os.environ.get('SOURCE_DATE_EPOCH') else datetime(2000, 1, 1))
+
+def _zip_entry_info(name, timestamp, compress_type=zipfile.ZIP_DEFLATED):
+    """ZipInfo with a given modification time and platform-independent attributes"""
+    info = zipfile.ZipInfo(name, date_time=timestamp.timetuple()[:6])
+    info.compress_type = compress_type
+    info.create_system = 3
+    info.external_attr = 0o644 << 16
+    return info
+
+@lru_cache(maxsize=65536)
+def _cached_string_width(text, font_name, font_size):
+    """Measure text width in points, memoized across tables and documents"""
+    return stringWidth(text, font_name, font_size)
+
+class StreamingODSWriter:
+    """Stream ODS spreadsheets row by row straight into the ZIP container"""
+    
+    MIMETYPE = 'application/vnd.oasis.opendocument.spreadsheet'
+    
+    NAMESPACES = (
+        'xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+        'xmlns:style="urn:oasis:names:tc:opendocument:xmlns:style:1.0" '
+        'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" '
+        'xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0" '
+        'xmlns:meta="urn:oasis:names:tc:opendocument:xmlns:meta:1.0"'
+    )
+    
+    # Characters that are not allowed in XML 1.0 documents
+    INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+    SPACE_RUNS = re.compile(r'  +')
+    
+    def __init__(self, fileobj, timestamp=None):
+        self._zip = zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED)
+        self._timestamp = timestamp or datetime.now()
+        self._content = None
+        self._in_sheet = False
+        self._sheet_rows = 0
+        
+        # The mimetype entry must come first and be stored uncompressed
+        self._write_entry('mimetype', self.MIMETYPE, zipfile.ZIP_STORED)
+        self._write_entry('META-INF/manifest.xml', self._manifest_xml())
+        self._write_entry('meta.xml', self._meta_xml())
+        self._write_entry('styles.xml', self._styles_xml())
+        
+        # content.xml is written last so it can stay open while rows stream in
+        self._content = self._zip.open(self._zip_info('content.xml'), 'w')
+        self._write(
+            "<?xml version='1.0' encoding='UTF-8'?>"
+            f'<office:document-content {self.NAMESPACES} office:version="1.2">'
+            '<office:automatic-styles/><office:body><office:spreadsheet>'
+        )
+    
+    def _zip_info(self, name, compress_type=zipfile.ZIP_DEFLATED):
+        return _zip_entry_info(name, self._timestamp, compress_type)
+    
+    def _write_entry(self, name, data, compress_type=zipfile.ZIP_DEFLATED):
+        self._zip.writestr(self._zip_info(name, compress_type), data.encode('utf-8'))
+    
+    def _write(self, xml):
+        self._content.write(xml.encode('utf-8'))
+    
+    def _manifest_xml(self):
+        entries = [('/', self.MIMETYPE), ('content.xml', 'text/xml'),
+                   ('styles.xml', 'text/xml'), ('meta.xml', 'text/xml')]
+        file_entries = ''.join(
+            f'<manifest:file-entry manifest:full-path="{path}" manifest:media-type="{media_type}"/>'
+            for path, media_type in entries
+        )
+        return (
+            "<?xml version='1.0' encoding='UTF-8'?>"
+            '<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0" '
+            f'manifest:version="1.2">{file_entries}</manifest:manifest>'
+        )
+    
+    def _meta_xml(self):
+        return (
+            "<?xml version='1.0' encoding='UTF-8'?>"
+            f'<office:document-meta {self.NAMESPACES} office:version="1.2">'
+            '<office:meta><meta:generator>DocuCraft AI</meta:generator></office:meta>'
+            '</office:document-meta>'
+        )
+    
+    def _styles_xml(self):
+        return (
+            "<?xml version='1.0' encoding='UTF-8'?>"
+            f'<office:document-styles {self.NAMESPACES} office:version="1.2">'
+            '<office:styles/></office:document-styles>'
+        )
+    
+    def _text_xml(self, value):
+        """Escape a cell value, keeping whitespace ODF would otherwise collapse"""
+        text = xml_escape(self.INVALID_XML_CHARS.sub('', value))
+        if '  ' in text:
+            text = self.SPACE_RUNS.sub(lambda m: f' <text:s text:c="{len(m.group(0)) - 1}"/>', text)
+        if text.startswith(' '):
+            text = '<text:s/>' + text[1:]
+        if '\t' in text:
+            text = text.replace('\t', '<text:tab/>')
+        if '\n' in text:
+            text = text.replace('\r\n', '\n').replace('\n', '<text:line-break/>')
+        return text
+    
+    def start_sheet(self, name, num_columns=None):
+        """Open a new sheet; rows written afterwards belong to it"""
+        if self._in_sheet:
+            self.end_sheet()
+        sheet_name = xml_escape(name, {'"': '&quot;'})
+        self._write(f'<table:table table:name="{sheet_name}">'
+                    f'<table:table-column table:number-columns-repeated="{max(num_columns or 1, 1)}"/>')
+        self._in_sheet = True
+        self._sheet_rows = 0
+    
+    def write_row(self, values):
+        """Write one row, collapsing runs of empty cells with number-columns-repeated"""
+        parts = ['<table:table-row>']
+        empty_run = 0
+        for value in values:
+            value = '' if value is None else str(value)
+            if not value:
+                empty_run += 1
+                continue
+            if empty_run:
+                parts.append(self._empty_cells(empty_run))
+                empty_run = 0
+            parts.append(f'<table:table-cell office:value-type="string"><text:p>{self._text_xml(value)}</text:p></table:table-cell>')
+        if empty_run or len(parts) == 1:
+            parts.append(self._empty_cells(max(empty_run, 1)))
+        parts.append('</table:table-row>')
+        self._write(''.join(parts))
+        self._sheet_rows += 1
+    
+    def write_rows(self, rows):
+        for row in rows:
+            self.write_row(row)
+    
+    def _empty_cells(self, count):
+        if count == 1:
+            return '<table:table-cell/>'
+        return f'<table:table-cell table:number-columns-repeated="{count}"/>'
+    
+    def end_sheet(self):
+        # A table needs at least one row to be valid
+        if not self._sheet_rows:
+            self.write_row([])
+        self._write('</table:table>')
+        self._in_sheet = False
+    
+    def close(self):
+        """Finish content.xml and the ZIP container"""
+        if self._in_sheet:
+            self.end_sheet()
+        self._write('</office:spreadsheet></office:body></office:document-content>')
+        self._content.close()
+        self._zip.close()
+
 class DocumentGenerator:
     """Generate documents in various formats"""
     
-    def __init__(self):
+    # Large PDF tables are emitted as LongTable flowables of at most this many rows
+    PDF_TABLE_CHUNK_ROWS = 500
+    # Rows sampled when sizing PDF table columns
+    PDF_TABLE_SAMPLE_ROWS = 200
+    # Upper bound on the text placed in a single PDF Paragraph flowable
+    PDF_PARAGRAPH_MAX_CHARS = 2000
+    
+    # Data rows per sheet for out-of-core Excel tables (the sheet limit less the header)
+    EXCEL_MAX_DATA_ROWS = 1048575
+    # Rows sampled when sizing out-of-core Excel columns
+    EXCEL_WIDTH_SAMPLE_ROWS = 1000
+    
+    # Word template parts that change per document; all others are shared by clones
+    WORD_PER_DOCUMENT_PARTS = ('/word/document.xml', '/docProps/core.xml')
+    # Word styles looked up once on the template instead of by name per paragraph
+    WORD_STYLE_NAMES = ['Title', 'Heading 1', 'Heading 2', 'Heading 3',
+                        'List Bullet', 'List Number', 'Table Grid']
+    
+    # Boundaries tried in order when a PDF text block is too long
+    PDF_TEXT_BREAKS = [
+        re.compile(r'\n'),
+        re.compile(r'(?<=[.!?])\s+'),
+        re.compile(r'\s+'),
+    ]
+    
+    def __init__(self, reproducible=False, timestamp=None):
+        # Reproducible mode stamps one fixed time into every document and ZIP
+        # entry so that identical inputs render to identical bytes
+        self.reproducible = reproducible
+        self.fixed_timestamp = timestamp or (REPRODUCIBLE_TIMESTAMP if reproducible else None)
+        
         self.color_schemes = {
             'professional': {
                 'primary': RGBColor(52, 73, 94),
@@ -1241,7 +2617,51 @@ class DocumentGenerator:
                 'success': RGBColor(40, 167, 69)
             }
         }
-    
+        
+        # Templates and styles are read-only during rendering, so build them once
+        # per generator and share them across documents
+        self._word_template = self._build_word_template()
+        self._word_styles = {name: self._word_template.styles[name] for name in self.WORD_STYLE_NAMES}
+        self.pdf_styles = self._build_pdf_styles()
+        self.excel_header_font = Font(bold=True, color="FFFFFF")
+        self.excel_header_fill = PatternFill(start_color="3498DB", end_color="3498DB", fill_type="solid")
+        self.excel_header_alignment = Alignment(horizontal="center")
+    
+    def _generated_on(self):
+        """Timestamp to stamp into generated documents"""
+        return self.fixed_timestamp or datetime.now()
+    
+    def _reproducible_zip(self, data):
+        """Rewrite a ZIP container with fixed entry timestamps, keeping entry order"""
+        source = zipfile.ZipFile(io.BytesIO(data))
+        output = io.BytesIO()
+        with zipfile.ZipFile(output, 'w') as target:
+            for info in source.infolist():
+                target.writestr(_zip_entry_info(info.filename, self._generated_on(), info.compress_type),
+                                source.read(info))
+        return output.getvalue()
+    
+    def _build_word_template(self):
+        """Parse the default Word template once and apply document-wide styling"""
+        template = Document()
+        template.styles['Title'].paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        return template
+    
+    def _new_word_document(self):
+        """Clone the cached Word template, sharing the parts documents never modify"""
+        package = self._word_template.part.package
+        memo = {id(part): part for part in package.iter_parts()
+                if part.partname not in self.WORD_PER_DOCUMENT_PARTS}
+        # Copy the part rather than the Document proxy, whose cached child
+        # proxies would otherwise point into a detached copy of the body
+        return copy.deepcopy(self._word_template.part, memo).document
+    
+    def _add_word_heading(self, doc, text, level):
+        """Add a heading using the preresolved template styles"""
+        style = self._word_styles['Title' if level == 0 else f'Heading {level}']
+        return doc.add_paragraph(text, style=style)
+    
+    @traced('generate.preview')
     def generate_preview_html(self, analysis_result, original_text):
         """Generate HTML preview of the document content"""
         structure = analysis_result['structure']
@@ -1253,14 +2673,15 @@ class DocumentGenerator:
                 Generated Document Preview
             </h1>
             <p style="color: #7f8c8d; font-style: italic;">
-                Generated on {datetime.now().strftime('%B %d, %Y')} • Content Type: {content_type.replace('_', ' ').title()}
+                Generated on {self._generated_on().strftime('%B %d, %Y')} • Content Type: {content_type.replace('_', ' ').title()}
             </p>
         """
         
         if content_type == 'tabular':
             html_content += self._generate_table_preview_html(structure['table_data'])
         elif structure.get('headings'):
-            html_content += self._generate_structured_preview_html(original_text, structure['headings'])
+            html_content += self._generate_structured_preview_html(original_text, structure['headings'],
+                                                                  self._sentence_index(analysis_result, original_text))
         elif structure.get('lists'):
             html_content += self._generate_list_preview_html(structure['lists'], original_text)
         else:
@@ -1312,13 +2733,13 @@ class DocumentGenerator:
         
         return html
     
-    def _generate_structured_preview_html(self, text, headings):
+    def _generate_structured_preview_html(self, text, headings, sentences=None):
         """Generate HTML preview for structured documents"""
         # Check if these are AI-generated headings
         ai_generated = any(h.get('type', '').startswith(('topic_', 'ai_', 'content_', 'auto_', 'section_')) for h in headings)
         
         if ai_generated and len(headings) > 2:
-            return self._generate_ai_structured_preview_html(text, headings)
+            return self._generate_ai_structured_preview_html(text, headings, sentences)
         else:
             # Use original line-based logic for natural headings
             lines = text.split('\n')
@@ -1353,18 +2774,19 @@ class DocumentGenerator:
             
             return html
     
-    def _generate_ai_structured_preview_html(self, text, headings):
+    def _generate_ai_structured_preview_html(self, text, headings, sentences=None):
         """Generate HTML preview for AI-generated structured documents"""
         html = ""
+        sections = self._assign_sentences_to_sections(text, headings, sentences)
         
-        for heading in headings:
+        for heading, section_sentences in zip(headings, sections):
             # Add the heading
             level = min(heading['level'], 6)
             heading_text = heading['text'].title()  # Capitalize each word
             html += f'<h{level} style="color: #34495e; margin-top: 1.5rem;">{heading_text}</h{level}>'
             
             # Extract content relevant to this heading
-            section_content = self._extract_section_content(text, heading)
+            section_content = self._extract_section_content(text, heading, section_sentences)
             if section_content:
                 # Clean up content for HTML display
                 section_content = section_content.replace('\n', ' ').strip()
@@ -1395,16 +2817,16 @@ class DocumentGenerator:
         
         return html
     
+    @traced('generate.word')
     def generate_word_document(self, analysis_result, original_text):
         """Generate a professional Word document"""
-        doc = Document()
+        doc = self._new_word_document()
         
-        # Add title and styling
-        title = doc.add_heading('Generated Document', 0)
-        title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        # Add title (centered by the template's Title style)
+        self._add_word_heading(doc, 'Generated Document', 0)
         
         # Add metadata
-        doc.add_paragraph(f"Generated on: {datetime.now().strftime('%B %d, %Y')}")
+        doc.add_paragraph(f"Generated on: {self._generated_on().strftime('%B %d, %Y')}")
         doc.add_paragraph("").add_run().add_break()
         
         structure = analysis_result['structure']
@@ -1414,7 +2836,8 @@ class DocumentGenerator:
             self._add_table_to_word(doc, structure['table_data'])
         
         elif structure.get('headings'):
-            self._add_structured_content_to_word(doc, original_text, structure['headings'])
+            self._add_structured_content_to_word(doc, original_text, structure['headings'],
+                                                 self._sentence_index(analysis_result, original_text))
         
         elif structure.get('lists'):
             self._add_lists_to_word(doc, structure['lists'], original_text)
@@ -1428,47 +2851,98 @@ class DocumentGenerator:
         
         return self._save_word_document(doc)
     
+    @traced('generate.word.table')
     def _add_table_to_word(self, doc, table_data):
         """Add table data to Word document"""
         if not table_data.get('is_table'):
             return
         
-        doc.add_heading('Data Table', level=1)
+        self._add_word_heading(doc, 'Data Table', 1)
         
         # Create table
         headers = table_data.get('header', [])
         rows = table_data.get('rows', [])
         
         if headers and rows:
-            table = doc.add_table(rows=1, cols=len(headers))
-            table.style = 'Table Grid'
-            
-            # Add headers
-            header_cells = table.rows[0].cells
-            for i, header in enumerate(headers):
-                if i < len(header_cells):
-                    header_cells[i].text = str(header)
-                    # Style header
-                    for paragraph in header_cells[i].paragraphs:
-                        for run in paragraph.runs:
-                            run.font.bold = True
-                            run.font.color.rgb = self.color_schemes['professional']['primary']
-            
-            # Add data rows
-            for row_data in rows:
-                row_cells = table.add_row().cells
-                for i, cell_data in enumerate(row_data):
-                    if i < len(row_cells):
-                        row_cells[i].text = str(cell_data)
-    
-    def _add_structured_content_to_word(self, doc, text, headings):
+            table = doc.add_table(rows=0, cols=len(headers))
+            table.style = self._word_styles['Table Grid']
+            
+            # python-docx re-walks the table XML on every add_row() and cell access,
+            # so all rows are generated as one XML fragment and appended in bulk
+            col_widths = [grid_col.w for grid_col in table._tbl.tblGrid.gridCol_lst]
+            rows_xml = self._word_table_rows_xml(headers, rows, col_widths, table_data.get('alignments'))
+            table._tbl.extend(parse_xml(rows_xml))
+    
+    # Markdown column alignments as w:jc values
+    WORD_ALIGNMENTS = {'left': 'left', 'center': 'center', 'right': 'right'}
+    
+    def _word_table_rows_xml(self, headers, rows, col_widths, alignments=None):
+        """Build the w:tr elements for a table header and its data rows"""
+        cell_starts = [
+            f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{width}"/></w:tcPr>'
+            if width is not None else '<w:tc>'
+            for width in col_widths
+        ]
+        paragraph_props = None
+        if alignments:
+            paragraph_props = [
+                f'<w:pPr><w:jc w:val="{self.WORD_ALIGNMENTS[alignment]}"/></w:pPr>'
+                if alignment in self.WORD_ALIGNMENTS else ''
+                for alignment in list(alignments)[:len(cell_starts)]
+            ]
+            paragraph_props += [''] * (len(cell_starts) - len(paragraph_props))
+        header_color = str(self.color_schemes['professional']['primary'])
+        header_run_props = f'<w:rPr><w:b/><w:color w:val="{header_color}"/></w:rPr>'
+        
+        parts = [f'<w:tbl {nsdecls("w")}>']
+        parts.append(self._word_table_row_xml(headers, cell_starts, header_run_props, paragraph_props))
+        for row_data in rows:
+            parts.append(self._word_table_row_xml(row_data, cell_starts, '', paragraph_props))
+        parts.append('</w:tbl>')
+        
+        return ''.join(parts)
+    
+    def _word_table_row_xml(self, values, cell_starts, run_props, paragraph_props=None):
+        """Build one w:tr, matching the markup of cell.text assignments"""
+        parts = ['<w:tr>']
+        values = list(values)
+        for i, cell_start in enumerate(cell_starts):
+            text = str(values[i]) if i < len(values) else ''
+            parts.append(cell_start)
+            parts.append(self._word_paragraph_xml(text, run_props, paragraph_props[i] if paragraph_props else ''))
+            parts.append('</w:tc>')
+        parts.append('</w:tr>')
+        return ''.join(parts)
+    
+    def _word_paragraph_xml(self, text, run_props, paragraph_props=''):
+        """Build a w:p holding text, with tabs and line breaks as run content"""
+        text = StreamingODSWriter.INVALID_XML_CHARS.sub('', text)
+        if not text:
+            return f'<w:p>{paragraph_props}</w:p>' if paragraph_props else '<w:p/>'
+        
+        run_content = []
+        for segment in re.split(r'(\t|\r\n|\n|\r)', text):
+            if segment == '\t':
+                run_content.append('<w:tab/>')
+            elif segment in ('\n', '\r', '\r\n'):
+                run_content.append('<w:br/>')
+            elif segment:
+                if segment != segment.strip():
+                    run_content.append(f'<w:t xml:space="preserve">{xml_escape(segment)}</w:t>')
+                else:
+                    run_content.append(f'<w:t>{xml_escape(segment)}</w:t>')
+        
+        return f'<w:p>{paragraph_props}<w:r>{run_props}{"".join(run_content)}</w:r></w:p>'
+    
+    @traced('generate.word.structured_content')
+    def _add_structured_content_to_word(self, doc, text, headings, sentences=None):
         """Add structured content with headings to Word document"""
         # Check if these are AI-generated headings (they often have line_number 0 and dense text)
         ai_generated = any(h.get('type', '').startswith(('topic_', 'ai_', 'content_', 'auto_', 'section_')) for h in headings)
         
         if ai_generated and len(headings) > 2:
             # For AI-generated structure, distribute content intelligently
-            self._add_ai_structured_content_to_word(doc, text, headings)
+            self._add_ai_structured_content_to_word(doc, text, headings, sentences)
         else:
             # Use original line-based logic for natural headings
             lines = text.split('\n')
@@ -1483,7 +2957,7 @@ class DocumentGenerator:
                         doc.add_paragraph(content)
                 
                 # Add the heading
-                doc.add_heading(heading['text'], level=min(heading['level'], 3))
+                self._add_word_heading(doc, heading['text'], min(heading['level'], 3))
                 current_pos = heading['line_number'] + 1
             
             # Add remaining content
@@ -1492,15 +2966,17 @@ class DocumentGenerator:
                 if remaining_content:
                     doc.add_paragraph(remaining_content)
     
-    def _add_ai_structured_content_to_word(self, doc, text, headings):
+    @traced('generate.word.ai_structured_content')
+    def _add_ai_structured_content_to_word(self, doc, text, headings, sentences=None):
         """Add AI-generated structured content to Word document"""
         # Extract relevant content for each section based on keywords
-        for heading in headings:
+        sections = self._assign_sentences_to_sections(text, headings, sentences)
+        for heading, section_sentences in zip(headings, sections):
             heading_text = heading['text'].title()  # Capitalize each word
-            doc.add_heading(heading_text, level=min(heading['level'], 3))
+            self._add_word_heading(doc, heading_text, min(heading['level'], 3))
             
             # Extract content relevant to this heading
-            section_content = self._extract_section_content(text, heading)
+            section_content = self._extract_section_content(text, heading, section_sentences)
             if section_content:
                 section_content = self._capitalize_sentences(section_content)
                 doc.add_paragraph(section_content)
@@ -1508,8 +2984,12 @@ class DocumentGenerator:
                 # Fallback: add a portion of the original text
                 doc.add_paragraph("Content extracted from the original document based on intelligent analysis.")
     
-    def _extract_section_content(self, text, heading):
-        """Extract content relevant to a specific heading"""
+    def _extract_section_content(self, text, heading, section_sentences=None):
+        """Extract content relevant to a specific heading
+        
+        section_sentences are the sentences assigned to this heading by
+        _assign_sentences_to_sections; they are computed when not given.
+        """
         heading_text = heading['text'].lower()
         text_lower = text.lower()
         
@@ -1562,74 +3042,131 @@ class DocumentGenerator:
                         if len(content) > 50:  # Only return substantial content
                             return content
         
-        # Fallback: extract a relevant portion based on keywords
-        heading_keywords = heading_text.split()
-        for keyword in heading_keywords:
-            if len(keyword) > 3:  # Skip short words
-                # Find sentences containing the keyword
-                sentences = text.split('.')
-                for sentence in sentences:
-                    if keyword in sentence.lower():
-                        sentence = sentence.strip() + '.'
-                        return self._capitalize_sentences(sentence)
+        # Fallback: the sentences that match this heading better than any other
+        if section_sentences is None:
+            section_sentences = self._assign_sentences_to_sections(text, [heading])[0]
+        if section_sentences:
+            return self._capitalize_sentences(' '.join(section_sentences))
         
         return None
     
-    def _capitalize_sentences(self, text):
-        """Capitalize the first letter of each sentence"""
-        if not text:
-            return text
+    def _sentence_index(self, analysis_result, text):
+        """The analysis's SentenceIndex when it segmented this text, else None (segment on demand)"""
+        sentences = analysis_result.get('sentence_index')
+        return sentences if sentences is not None and sentences.text == text else None
+    
+    @traced('generate.assign_sections')
+    def _assign_sentences_to_sections(self, text, headings, sentences=None):
+        """Assign each sentence to the heading it matches best by TF-IDF cosine similarity
         
-        # Split into sentences and capitalize each one
-        sentences = text.split('. ')
-        capitalized_sentences = []
-        
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if sentence:
-                # Capitalize first letter
-                sentence = sentence[0].upper() + sentence[1:] if len(sentence) > 1 else sentence.upper()
-            capitalized_sentences.append(sentence)
+        Only heading keywords (words longer than 3 characters) can score, so the
+        sparse sentence x term matrix is built from one regex scan for those words
+        and is multiplied by the small term x heading matrix in a single product.
+        Returns, per heading, its sentences in document order. sentences is the
+        text's SentenceIndex, segmented here when not given.
+        """
+        sections = [[] for _ in headings]
+        heading_terms = [{word for word in re.findall(r'\w+', heading['text'].lower()) if len(word) > 3}
+                         for heading in headings]
+        vocabulary = {term: j for j, term in enumerate(sorted(set().union(*heading_terms)))}
+        if not vocabulary:
+            return sections
+        
+        if sentences is None:
+            sentences = SentenceIndex(text)
+        
+        # Splitting on the heading terms returns them interleaved with the text
+        # between them, so their positions follow from the piece lengths
+        pieces = re.split(
+            r'\b(' + '|'.join(map(re.escape, sorted(vocabulary, key=len, reverse=True))) + r')\b',
+            text, flags=re.IGNORECASE
+        )
+        offsets = np.cumsum(np.fromiter(map(len, pieces), dtype=np.int64, count=len(pieces)))
+        ids = np.fromiter(map(vocabulary.get, map(str.lower, pieces[1::2]), repeat(-1)),
+                          dtype=np.int64, count=len(pieces) // 2)
+        rows = sentences.locate(offsets[0:-1:2])
+        is_term = (ids >= 0) & (rows >= 0)
+        if not is_term.any():
+            return sections
+        rows, terms = rows[is_term], ids[is_term]
+        
+        # Sparse sentence x term counts (rows are already in document order)
+        num_terms = len(vocabulary)
+        cells, counts = np.unique(rows * num_terms + terms, return_counts=True)
+        rows, terms = np.divmod(cells, num_terms)
+        
+        # Smoothed IDF over sentences, then L2-normalized TF-IDF sentence vectors
+        document_frequency = np.bincount(terms, minlength=num_terms)
+        idf = np.log((1 + len(sentences)) / (1 + document_frequency)) + 1
+        weights = counts * idf[terms]
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2))
+        weights /= norms[rows]
+        
+        # Heading vectors as a dense term x heading matrix (few terms, few headings)
+        heading_matrix = np.zeros((num_terms, len(headings)))
+        for k, term_set in enumerate(heading_terms):
+            for term in term_set:
+                heading_matrix[vocabulary[term], k] = idf[vocabulary[term]]
+        column_norms = np.linalg.norm(heading_matrix, axis=0)
+        heading_matrix /= np.where(column_norms > 0, column_norms, 1)
+        
+        # CSR-style product: sum each sentence's weighted heading rows
+        row_starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        scores = np.add.reduceat(weights[:, None] * heading_matrix[terms], row_starts, axis=0)
+        best = scores.argmax(axis=1)
+        
+        for row, section, score in zip(rows[row_starts], best, scores[np.arange(len(best)), best]):
+            if score > 0:
+                sections[section].append(sentences[row])
+        return sections
+    
+    def _capitalize_sentences(self, text):
+        """Capitalize the first letter of each sentence"""
+        if not text:
+            return text
         
-        return '. '.join(capitalized_sentences)
+        # Extracted snippets are segmented like documents, but not cached with them
+        chars = list(text)
+        for start in SentenceIndex(text).starts.tolist():
+            chars[start] = chars[start].upper()
+        return ''.join(chars)
     
+    @traced('generate.word.lists')
     def _add_lists_to_word(self, doc, lists, original_text):
         """Add list structures to Word document"""
-        doc.add_heading('Organized Content', level=1)
+        self._add_word_heading(doc, 'Organized Content', 1)
         
         for list_data in lists:
             list_type = list_data.get('type', 'bullet')
+            style = self._word_styles['List Bullet' if list_type == 'bullet' else 'List Number']
             
             for item in list_data['items']:
-                p = doc.add_paragraph(item, style='List Bullet' if list_type == 'bullet' else 'List Number')
+                doc.add_paragraph(item, style=style)
     
+    @traced('generate.word.save')
     def _save_word_document(self, doc):
         """Save Word document to memory and return download data"""
+        if self.reproducible:
+            doc.core_properties.created = self._generated_on()
+            doc.core_properties.modified = self._generated_on()
+        
         doc_io = io.BytesIO()
         doc.save(doc_io)
         doc_io.seek(0)
+        if self.reproducible:
+            return self._reproducible_zip(doc_io.getvalue())
         return doc_io.getvalue()
     
+    @traced('generate.pdf')
     def generate_pdf_document(self, analysis_result, original_text):
         """Generate a professional PDF document"""
         buffer = io.BytesIO()
+        # invariant fixes the PDF creation date and document ID
         doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72,
-                               topMargin=72, bottomMargin=18)
-        
-        # Define styles
-        styles = getSampleStyleSheet()
-        styles.add(ParagraphStyle(name='CustomTitle',
-                                 parent=styles['Heading1'],
-                                 fontSize=24,
-                                 spaceAfter=30,
-                                 alignment=1,  # Center
-                                 textColor=colors.HexColor('#2c3e50')))
+                               topMargin=72, bottomMargin=18,
+                               invariant=1 if self.reproducible else None)
         
-        styles.add(ParagraphStyle(name='CustomHeading',
-                                 parent=styles['Heading2'],
-                                 fontSize=16,
-                                 spaceAfter=12,
-                                 textColor=colors.HexColor('#3498db')))
+        styles = self.pdf_styles
         
         story = []
         
@@ -1638,51 +3175,117 @@ class DocumentGenerator:
         story.append(Spacer(1, 12))
         
         # Add metadata
-        story.append(Paragraph(f"Generated on: {datetime.now().strftime('%B %d, %Y')}", styles['Normal']))
+        story.append(Paragraph(f"Generated on: {self._generated_on().strftime('%B %d, %Y')}", styles['Normal']))
         story.append(Spacer(1, 20))
         
         structure = analysis_result['structure']
         
         # Handle different content types
         if analysis_result['content_type'] == 'tabular':
-            self._add_table_to_pdf(story, structure['table_data'], styles)
+            self._add_table_to_pdf(story, structure['table_data'], styles, doc.width)
         
         elif structure.get('headings'):
-            self._add_structured_content_to_pdf(story, original_text, structure['headings'], styles)
+            self._add_structured_content_to_pdf(story, original_text, structure['headings'], styles,
+                                                self._sentence_index(analysis_result, original_text))
         
         elif structure.get('lists'):
             self._add_lists_to_pdf(story, structure['lists'], original_text, styles)
         
         else:
             # Simple paragraph format
-            paragraphs = original_text.split('\n\n')
-            for para in paragraphs:
-                if para.strip():
-                    story.append(Paragraph(para.strip(), styles['Normal']))
-                    story.append(Spacer(1, 12))
+            self._add_text_to_pdf(story, original_text, styles['Normal'])
+            story.append(Spacer(1, 12))
         
-        doc.build(story)
+        with trace_stage('generate.pdf.build', len(story), 'flowables'):
+            doc.build(story)
         buffer.seek(0)
         return buffer.getvalue()
     
-    def _add_table_to_pdf(self, story, table_data, styles):
-        """Add table to PDF"""
+    def _build_pdf_styles(self):
+        """Build the PDF stylesheet with the custom title and heading styles"""
+        styles = getSampleStyleSheet()
+        styles.add(ParagraphStyle(name='CustomTitle',
+                                 parent=styles['Heading1'],
+                                 fontSize=24,
+                                 spaceAfter=30,
+                                 alignment=1,  # Center
+                                 textColor=colors.HexColor('#2c3e50')))
+        
+        styles.add(ParagraphStyle(name='CustomHeading',
+                                 parent=styles['Heading2'],
+                                 fontSize=16,
+                                 spaceAfter=12,
+                                 textColor=colors.HexColor('#3498db')))
+        return styles
+    
+    def _add_text_to_pdf(self, story, text, style):
+        """Add plain text to PDF as bounded, escaped Paragraph flowables"""
+        blocks = [block.strip() for block in re.split(r'\n\s*\n', text) if block.strip()]
+        
+        for i, block in enumerate(blocks):
+            if i:
+                story.append(Spacer(1, 12))
+            
+            # reportlab wraps and splits paragraphs superlinearly in their length,
+            # so long blocks become several consecutive paragraphs
+            for chunk in self._split_pdf_text(block):
+                story.append(Paragraph(xml_escape(chunk), style))
+    
+    def _split_pdf_text(self, text, level=0):
+        """Split text into chunks of at most PDF_PARAGRAPH_MAX_CHARS at natural boundaries"""
+        limit = self.PDF_PARAGRAPH_MAX_CHARS
+        if len(text) <= limit:
+            return [text]
+        
+        if level >= len(self.PDF_TEXT_BREAKS):
+            # No boundary left to split on, fall back to fixed-size slices
+            return [text[i:i + limit] for i in range(0, len(text), limit)]
+        
+        joiner = '\n' if level == 0 else ' '
+        chunks = []
+        current = []
+        current_size = 0
+        
+        for piece in self.PDF_TEXT_BREAKS[level].split(text):
+            piece = piece.strip()
+            if not piece:
+                continue
+            
+            if len(piece) > limit:
+                if current:
+                    chunks.append(joiner.join(current))
+                    current, current_size = [], 0
+                chunks.extend(self._split_pdf_text(piece, level + 1))
+                continue
+            
+            if current and current_size + len(piece) + 1 > limit:
+                chunks.append(joiner.join(current))
+                current, current_size = [], 0
+            
+            current.append(piece)
+            current_size += len(piece) + 1
+        
+        if current:
+            chunks.append(joiner.join(current))
+        
+        return chunks
+    
+    @traced('generate.pdf.table', size_arg=1)
+    def _add_table_to_pdf(self, story, table_data, styles, available_width):
+        """Add table to PDF as header-repeating LongTable chunks"""
         if not table_data.get('is_table'):
             return
         
         story.append(Paragraph("Data Table", styles['CustomHeading']))
         story.append(Spacer(1, 12))
         
-        headers = table_data.get('header', [])
+        headers = [str(header) for header in table_data.get('header', [])]
         rows = table_data.get('rows', [])
         
         if headers and rows:
-            # Prepare table data
-            table_content = [headers] + rows
-            
-            # Create table
-            table = Table(table_content)
-            table.setStyle(TableStyle([
+            num_columns = len(headers)
+            col_widths = self._pdf_table_column_widths(headers, rows, available_width)
+            table_style = TableStyle([
                 ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498db')),
                 ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
                 ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
@@ -1691,19 +3294,58 @@ class DocumentGenerator:
                 ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
                 ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
                 ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
+            ])
+            # Markdown column alignments override the centered default
+            for col, alignment in enumerate((table_data.get('alignments') or [])[:num_columns]):
+                if alignment:
+                    table_style.add('ALIGN', (col, 0), (col, -1), alignment.upper())
+            
+            # Fixed column widths spare reportlab from measuring every cell, and
+            # bounded chunks keep each flowable cheap to split across pages
+            row_iter = iter(rows)
+            while True:
+                chunk = [self._pdf_table_row(row, num_columns)
+                         for row in islice(row_iter, self.PDF_TABLE_CHUNK_ROWS)]
+                if not chunk:
+                    break
+                story.append(LongTable([headers] + chunk, colWidths=col_widths,
+                                       repeatRows=1, style=table_style))
             
-            story.append(table)
             story.append(Spacer(1, 20))
     
-    def _add_structured_content_to_pdf(self, story, text, headings, styles):
+    def _pdf_table_row(self, row, num_columns):
+        """Normalize a table row to strings with exactly num_columns cells"""
+        cells = [str(cell) for cell in row[:num_columns]]
+        if len(cells) < num_columns:
+            cells.extend([''] * (num_columns - len(cells)))
+        return cells
+    
+    def _pdf_table_column_widths(self, headers, rows, available_width):
+        """Size PDF table columns from the header and a sample of rows"""
+        padding = 12  # Default left + right cell padding
+        widths = [_cached_string_width(header, 'Helvetica-Bold', 12) + padding for header in headers]
+        
+        for row in islice(rows, self.PDF_TABLE_SAMPLE_ROWS):
+            for i, cell in enumerate(self._pdf_table_row(row, len(headers))):
+                widths[i] = max(widths[i], _cached_string_width(cell, 'Helvetica', 10) + padding)
+        
+        # Shrink proportionally when the natural widths overflow the frame
+        total_width = sum(widths)
+        if total_width > available_width:
+            scale = available_width / total_width
+            widths = [width * scale for width in widths]
+        
+        return widths
+    
+    @traced('generate.pdf.structured_content', size_arg=1)
+    def _add_structured_content_to_pdf(self, story, text, headings, styles, sentences=None):
         """Add structured content to PDF"""
         # Check if these are AI-generated headings
         ai_generated = any(h.get('type', '').startswith(('topic_', 'ai_', 'content_', 'auto_', 'section_')) for h in headings)
         
         if ai_generated and len(headings) > 2:
             # For AI-generated structure, distribute content intelligently
-            self._add_ai_structured_content_to_pdf(story, text, headings, styles)
+            self._add_ai_structured_content_to_pdf(story, text, headings, styles, sentences)
         else:
             # Use original line-based logic for natural headings
             lines = text.split('\n')
@@ -1715,11 +3357,11 @@ class DocumentGenerator:
                     content_lines = lines[current_pos:heading['line_number']]
                     content = '\n'.join(content_lines).strip()
                     if content:
-                        story.append(Paragraph(content, styles['Normal']))
+                        self._add_text_to_pdf(story, content, styles['Normal'])
                         story.append(Spacer(1, 12))
                 
                 # Add the heading
-                story.append(Paragraph(heading['text'], styles['CustomHeading']))
+                story.append(Paragraph(xml_escape(heading['text']), styles['CustomHeading']))
                 story.append(Spacer(1, 8))
                 current_pos = heading['line_number'] + 1
             
@@ -1727,30 +3369,31 @@ class DocumentGenerator:
             if current_pos < len(lines):
                 remaining_content = '\n'.join(lines[current_pos:]).strip()
                 if remaining_content:
-                    story.append(Paragraph(remaining_content, styles['Normal']))
+                    self._add_text_to_pdf(story, remaining_content, styles['Normal'])
     
-    def _add_ai_structured_content_to_pdf(self, story, text, headings, styles):
+    @traced('generate.pdf.ai_structured_content', size_arg=1)
+    def _add_ai_structured_content_to_pdf(self, story, text, headings, styles, sentences=None):
         """Add AI-generated structured content to PDF"""
-        from reportlab.platypus import Paragraph, Spacer
-        
         # Extract relevant content for each section based on keywords
-        for heading in headings:
+        sections = self._assign_sentences_to_sections(text, headings, sentences)
+        for heading, section_sentences in zip(headings, sections):
             # Add the heading
             heading_text = heading['text'].title()  # Capitalize each word
-            story.append(Paragraph(heading_text, styles['CustomHeading']))
+            story.append(Paragraph(xml_escape(heading_text), styles['CustomHeading']))
             story.append(Spacer(1, 8))
             
             # Extract content relevant to this heading
-            section_content = self._extract_section_content(text, heading)
+            section_content = self._extract_section_content(text, heading, section_sentences)
             if section_content:
                 section_content = self._capitalize_sentences(section_content)
-                story.append(Paragraph(section_content, styles['Normal']))
+                self._add_text_to_pdf(story, section_content, styles['Normal'])
             else:
                 # Fallback: add a portion of the original text
                 story.append(Paragraph("Content extracted from the original document based on intelligent analysis.", styles['Normal']))
             
             story.append(Spacer(1, 12))
     
+    @traced('generate.pdf.lists', size_arg=1)
     def _add_lists_to_pdf(self, story, lists, original_text, styles):
         """Add lists to PDF"""
         story.append(Paragraph("Organized Content", styles['CustomHeading']))
@@ -1758,18 +3401,28 @@ class DocumentGenerator:
         
         for list_data in lists:
             for item in list_data['items']:
-                story.append(Paragraph(f"• {item}", styles['Normal']))
+                story.append(Paragraph(f"• {xml_escape(item)}", styles['Normal']))
                 story.append(Spacer(1, 6))
     
+    @traced('generate.excel')
     def generate_excel_document(self, analysis_result, original_text):
         """Generate Excel document"""
+        table_data = analysis_result['structure'].get('table_data', {})
+        if (analysis_result['content_type'] in ['tabular', 'mixed_tabular'] and table_data.get('is_table')
+                and getattr(table_data.get('rows'), 'out_of_core', False)):
+            return self._generate_excel_out_of_core(table_data.get('header', []), table_data['rows'])
+        
+        tables = analysis_result['structure'].get('tables', [])
+        if analysis_result['content_type'] in ['tabular', 'mixed_tabular'] and len(tables) > 1:
+            return self._generate_excel_tables(tables)
+        
         wb = Workbook()
         ws = wb.active
         ws.title = "Generated Data"
         
-        # Define styles
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="3498DB", end_color="3498DB", fill_type="solid")
+        # Shared styles (openpyxl style objects are immutable)
+        header_font = self.excel_header_font
+        header_fill = self.excel_header_fill
         
         structure = analysis_result['structure']
         
@@ -1785,7 +3438,7 @@ class DocumentGenerator:
                     cell = ws.cell(row=1, column=col, value=str(header))
                     cell.font = header_font
                     cell.fill = header_fill
-                    cell.alignment = Alignment(horizontal="center")
+                    cell.alignment = self.excel_header_alignment
                 
                 # Add data
                 for row_idx, row_data in enumerate(rows, 2):
@@ -1836,7 +3489,36 @@ class DocumentGenerator:
                     ws.cell(row=idx, column=1, value=f"Paragraph {idx-1}")
                     ws.cell(row=idx, column=2, value=para[:500] + "..." if len(para) > 500 else para)
         
-        # Auto-adjust column widths
+        self._autofit_excel_columns(ws)
+        
+        # Save to memory
+        return self._save_excel_workbook(wb)
+    
+    @traced('generate.excel.tables')
+    def _generate_excel_tables(self, tables):
+        """Write each detected table region to its own sheet"""
+        wb = Workbook()
+        wb.remove(wb.active)
+        
+        for number, table in enumerate(tables, 1):
+            ws = wb.create_sheet(f"Table {number}")
+            
+            for col, header in enumerate(table['header'], 1):
+                cell = ws.cell(row=1, column=col, value=str(header))
+                cell.font = self.excel_header_font
+                cell.fill = self.excel_header_fill
+                cell.alignment = self.excel_header_alignment
+            
+            for row_idx, row_data in enumerate(table['rows'], 2):
+                for col_idx, cell_data in enumerate(row_data, 1):
+                    ws.cell(row=row_idx, column=col_idx, value=str(cell_data))
+            
+            self._autofit_excel_columns(ws)
+        
+        return self._save_excel_workbook(wb)
+    
+    def _autofit_excel_columns(self, ws):
+        """Auto-adjust column widths to the longest value, capped at 50"""
         for column in ws.columns:
             max_length = 0
             column_letter = column[0].column_letter
@@ -1848,13 +3530,62 @@ class DocumentGenerator:
                     pass
             adjusted_width = min(max_length + 2, 50)
             ws.column_dimensions[column_letter].width = adjusted_width
+    
+    @traced('generate.excel.out_of_core', size_arg=1)
+    def _generate_excel_out_of_core(self, headers, rows):
+        """Stream a huge table into a write-only workbook, one sheet per million rows"""
+        wb = Workbook(write_only=True)
+        
+        # Column widths have to be set before any row is written, so size them from a sample
+        widths = [len(str(header)) for header in headers]
+        for row in islice(rows, self.EXCEL_WIDTH_SAMPLE_ROWS):
+            for i, value in enumerate(row[:len(widths)]):
+                widths[i] = max(widths[i], len(str(value)))
+        
+        row_iter = iter(rows)
+        next_row = next(row_iter, None)
+        sheet_number = 1
+        while True:
+            ws = wb.create_sheet("Generated Data" if sheet_number == 1 else f"Generated Data ({sheet_number})")
+            for i, width in enumerate(widths, 1):
+                ws.column_dimensions[get_column_letter(i)].width = min(width + 2, 50)
+            
+            header_cells = []
+            for header in headers:
+                cell = WriteOnlyCell(ws, value=str(header))
+                cell.font = self.excel_header_font
+                cell.fill = self.excel_header_fill
+                cell.alignment = self.excel_header_alignment
+                header_cells.append(cell)
+            ws.append(header_cells)
+            
+            written = 0
+            while next_row is not None and written < self.EXCEL_MAX_DATA_ROWS:
+                ws.append(next_row)
+                written += 1
+                next_row = next(row_iter, None)
+            if next_row is None:
+                break
+            sheet_number += 1
         
-        # Save to memory
+        return self._save_excel_workbook(wb)
+    
+    @traced('generate.excel.save')
+    def _save_excel_workbook(self, wb):
+        """Save Excel workbook to memory and return download data"""
         excel_io = io.BytesIO()
+        if self.reproducible:
+            # Workbook.save() always stamps the current time as the modified date
+            wb.properties.created = self._generated_on()
+            wb.properties.modified = self._generated_on()
+            ExcelWriter(wb, zipfile.ZipFile(excel_io, 'w', zipfile.ZIP_DEFLATED, allowZip64=True)).save()
+            return self._reproducible_zip(excel_io.getvalue())
+        
         wb.save(excel_io)
         excel_io.seek(0)
         return excel_io.getvalue()
     
+    @traced('generate.csv')
     def generate_csv_document(self, analysis_result, original_text):
         """Generate CSV document"""
         structure = analysis_result['structure']
@@ -1866,14 +3597,15 @@ class DocumentGenerator:
                 headers = table_data.get('header', [])
                 rows = table_data.get('rows', [])
                 
-                df = pd.DataFrame(rows, columns=headers)
+                if getattr(rows, 'out_of_core', False):
+                    # Stream huge tables row by row instead of building a DataFrame
+                    return self._write_csv(headers, rows)
+                
+                df = table_frame(rows, headers)
             else:
-                # Convert text lines to CSV
-                lines = [line.strip() for line in original_text.split('\n') if line.strip()]
-                df = pd.DataFrame({
-                    'Line_Number': range(1, len(lines) + 1),
-                    'Content': lines
-                })
+                # Convert text lines to CSV, one line at a time
+                lines = filter(None, map(str.strip, iter_lines(original_text)))
+                return self._write_csv(['Line_Number', 'Content'], enumerate(lines, 1))
         
         else:
             # Convert other content types to CSV
@@ -1890,14 +3622,23 @@ class DocumentGenerator:
                     for i, heading in enumerate(headings)
                 ])
             else:
-                paragraphs = [p.strip() for p in original_text.split('\n\n') if p.strip()]
-                df = pd.DataFrame({
-                    'Paragraph': [f"Paragraph {i+1}" for i in range(len(paragraphs))],
-                    'Content': [p[:500] + "..." if len(p) > 500 else p for p in paragraphs]
-                })
+                paragraphs = filter(None, map(str.strip, iter_lines(original_text, '\n\n')))
+                return self._write_csv(['Paragraph', 'Content'], (
+                    (f"Paragraph {i}", p[:500] + "..." if len(p) > 500 else p)
+                    for i, p in enumerate(paragraphs, 1)
+                ))
         
         return df.to_csv(index=False)
     
+    def _write_csv(self, headers, rows):
+        """CSV text written row by row, in the same dialect as DataFrame.to_csv"""
+        csv_io = io.StringIO()
+        writer = csv.writer(csv_io, lineterminator=os.linesep)
+        writer.writerow(headers)
+        writer.writerows(rows)
+        return csv_io.getvalue()
+    
+    @traced('generate.json')
     def generate_json_document(self, analysis_result, original_text):
         """Generate JSON document"""
         structure = analysis_result['structure']
@@ -1911,7 +3652,7 @@ class DocumentGenerator:
                 # Create a wrapper with metadata but keep original data intact
                 json_output = {
                     'metadata': {
-                        'generated_on': datetime.now().isoformat(),
+                        'generated_on': self._generated_on().isoformat(),
                         'content_type': 'json_data',
                         'confidence': analysis_result['confidence'],
                         'json_structure': structure.get('json_data', {}).get('structure_info', {}),
@@ -1920,7 +3661,7 @@ class DocumentGenerator:
                     'original_data': parsed_original
                 }
                 
-                return json.dumps(json_output, indent=2, ensure_ascii=False)
+                return json.dumps(json_output, indent=2, ensure_ascii=False, default=_json_default)
                 
             except (json.JSONDecodeError, ValueError):
                 # Fallback if somehow the original parsing failed
@@ -1929,7 +3670,7 @@ class DocumentGenerator:
         # For non-JSON input, create structured JSON from analysis
         json_data = {
             'metadata': {
-                'generated_on': datetime.now().isoformat(),
+                'generated_on': self._generated_on().isoformat(),
                 'content_type': analysis_result['content_type'],
                 'confidence': analysis_result['confidence'],
                 'text_stats': structure.get('stats', {})
@@ -1967,121 +3708,1021 @@ class DocumentGenerator:
             'paragraphs': [p.strip() for p in original_text.split('\n\n') if p.strip()]
         }
         
-        return json.dumps(json_data, indent=2, ensure_ascii=False)
+        return json.dumps(json_data, indent=2, ensure_ascii=False, default=_json_default)
     
+    # SQLite column affinities for ColumnarTable column kinds
+    SQLITE_AFFINITIES = {'int': 'INTEGER', 'float': 'REAL', 'text': 'TEXT'}
+    SQLITE_BATCH_ROWS = 10000
+    
+    @traced('generate.sqlite')
+    def generate_sqlite_document(self, analysis_result, original_text, index_columns=None):
+        """Generate SQLite database document
+        
+        Tables become a generated_data table whose columns are named after the
+        header, with INTEGER/REAL affinity where every value round-trips as a
+        number; index_columns names header columns to index.
+        """
+        structure = analysis_result['structure']
+        table_data = structure.get('table_data', {})
+        
+        if analysis_result['content_type'] in ['tabular', 'mixed_tabular'] and table_data.get('is_table'):
+            headers = table_data.get('header', [])
+            rows = table_data.get('rows', [])
+            affinities = [self.SQLITE_AFFINITIES[kind] for kind in self._sqlite_column_kinds(rows, len(headers))]
+        else:
+            # Convert other content to simple table
+            headers = ['Line Number', 'Content']
+            lines = filter(None, map(str.strip, iter_lines(original_text)))
+            rows = ([i, line] for i, line in enumerate(lines, 1))
+            affinities = ['INTEGER', 'TEXT']
+        
+        fd, path = tempfile.mkstemp(suffix='.sqlite', prefix='docucraft-export-')
+        os.close(fd)
+        try:
+            # Autocommit mode: the bulk load manages its own transaction
+            connection = sqlite3.connect(path, isolation_level=None)
+            try:
+                # The file is written once and copied out, so skip journaling and fsyncs
+                for pragma in ('journal_mode = OFF', 'synchronous = OFF', 'locking_mode = EXCLUSIVE',
+                               'temp_store = MEMORY', 'cache_size = -65536'):
+                    connection.execute(f'PRAGMA {pragma}')
+                self._write_sqlite_table(connection, 'generated_data', headers, affinities, rows, index_columns)
+                connection.execute('CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT)')
+                connection.executemany('INSERT INTO metadata VALUES (?, ?)', [
+                    ('generated_on', self._generated_on().isoformat()),
+                    ('content_type', analysis_result['content_type']),
+                    ('separator', table_data.get('separator', '') if table_data.get('is_table') else ''),
+                ])
+            finally:
+                connection.close()
+            
+            with open(path, 'rb') as f:
+                return f.read()
+        finally:
+            os.remove(path)
+    
+    def _write_sqlite_table(self, connection, table_name, headers, affinities, rows, index_columns=None):
+        """Create a table and bulk insert rows in one transaction, then build indexes"""
+        column_names = self._sqlite_column_names(headers)
+        num_columns = len(column_names)
+        quote = lambda name: '"' + name.replace('"', '""') + '"'
+        
+        column_defs = ', '.join(f'{quote(name)} {affinity}' for name, affinity in zip(column_names, affinities))
+        connection.execute(f'CREATE TABLE {quote(table_name)} ({column_defs})')
+        insert = f"INSERT INTO {quote(table_name)} VALUES ({', '.join('?' * num_columns)})"
+        
+        connection.execute('BEGIN')
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, self.SQLITE_BATCH_ROWS))
+            if not batch:
+                break
+            # Ragged rows are padded or cut to the header width
+            batch = [row if len(row) == num_columns else (list(row[:num_columns]) + [None] * (num_columns - len(row)))
+                     for row in batch]
+            connection.executemany(insert, batch)
+        connection.execute('COMMIT')
+        
+        # Indexes are cheaper to build once after the bulk load
+        header_names = [str(header) for header in headers]
+        for header in index_columns or []:
+            if header in header_names:
+                column = column_names[header_names.index(header)]
+                connection.execute(f'CREATE INDEX {quote(f"idx_{table_name}_{column}")} '
+                                   f'ON {quote(table_name)} ({quote(column)})')
+    
+    def _sqlite_column_names(self, headers):
+        """Column names from the header, made non-empty and unique (SQLite names ignore case)"""
+        names = []
+        seen = set()
+        for i, header in enumerate(headers):
+            name = str(header).strip() or f'column_{i + 1}'
+            candidate, suffix = name, 2
+            while candidate.lower() in seen:
+                candidate = f'{name}_{suffix}'
+                suffix += 1
+            seen.add(candidate.lower())
+            names.append(candidate)
+        return names
+    
+    def _sqlite_column_kinds(self, rows, num_columns):
+        """Infer 'int', 'float' or 'text' per column with the same rules as ColumnarTable"""
+        if hasattr(rows, 'column_kinds') and rows.num_columns == num_columns:
+            return rows.column_kinds()
+        
+        is_int = [True] * num_columns
+        is_float = [True] * num_columns
+        seen_row = False
+        for row in rows:
+            seen_row = True
+            if len(row) != num_columns:
+                return ['text'] * num_columns
+            for i, value in enumerate(row):
+                if not isinstance(value, str):
+                    is_int[i] = is_float[i] = False
+                    continue
+                if is_int[i] and not ColumnarTable.INT_PATTERN.match(value):
+                    is_int[i] = False
+                if is_float[i] and not (ColumnarTable.FLOAT_PATTERN.match(value) and repr(float(value)) == value):
+                    is_float[i] = False
+        if not seen_row:
+            return ['text'] * num_columns
+        return ['int' if is_int[i] else 'float' if is_float[i] else 'text' for i in range(num_columns)]
+    
+    @traced('generate.ods')
     def generate_ods_document(self, analysis_result, original_text):
         """Generate ODS (Open Document Spreadsheet) document"""
-        doc = OpenDocumentSpreadsheet()
-        table = ODFTable(name="Generated Data")
+        ods_io = io.BytesIO()
+        writer = StreamingODSWriter(ods_io, timestamp=self._generated_on())
         
         structure = analysis_result['structure']
+        tables = structure.get('tables', [])
         
-        if analysis_result['content_type'] in ['tabular', 'mixed_tabular']:
+        if analysis_result['content_type'] in ['tabular', 'mixed_tabular'] and len(tables) > 1:
+            # One sheet per detected table region
+            for number, table in enumerate(tables, 1):
+                writer.start_sheet(f"Table {number}", table['num_columns'])
+                writer.write_row(table['header'])
+                writer.write_rows(table['rows'])
+        
+        elif analysis_result['content_type'] in ['tabular', 'mixed_tabular']:
             table_data = structure.get('table_data', {})
+            writer.start_sheet("Generated Data", table_data.get('num_columns'))
             
             if table_data.get('is_table'):
-                headers = table_data.get('header', [])
-                rows = table_data.get('rows', [])
-                
-                # Add header row
-                header_row = TableRow()
-                for header in headers:
-                    cell = TableCell()
-                    cell.addElement(P(text=str(header)))
-                    header_row.addElement(cell)
-                table.addElement(header_row)
-                
-                # Add data rows
-                for row_data in rows:
-                    data_row = TableRow()
-                    for cell_data in row_data:
-                        cell = TableCell()
-                        cell.addElement(P(text=str(cell_data)))
-                        data_row.addElement(cell)
-                    table.addElement(data_row)
+                # Rows are serialized as they are read, never held as an ODF tree
+                writer.write_row(table_data.get('header', []))
+                writer.write_rows(table_data.get('rows', []))
         
         else:
             # Convert other content to simple table
-            lines = [line.strip() for line in original_text.split('\n') if line.strip()]
-            
-            # Header
-            header_row = TableRow()
-            for header_text in ['Line Number', 'Content']:
-                cell = TableCell()
-                cell.addElement(P(text=header_text))
-                header_row.addElement(cell)
-            table.addElement(header_row)
-            
-            # Data
-            for idx, line in enumerate(lines, 1):
-                data_row = TableRow()
-                
-                # Line number cell
-                num_cell = TableCell()
-                num_cell.addElement(P(text=str(idx)))
-                data_row.addElement(num_cell)
-                
-                # Content cell
-                content_cell = TableCell()
-                content_cell.addElement(P(text=line))
-                data_row.addElement(content_cell)
-                
-                table.addElement(data_row)
+            writer.start_sheet("Generated Data", 2)
+            writer.write_row(['Line Number', 'Content'])
+            
+            line_number = 0
+            for line in iter_lines(original_text):
+                line = line.strip()
+                if line:
+                    line_number += 1
+                    writer.write_row([line_number, line])
+        
+        writer.close()
+        return ods_io.getvalue()
+
+class ArtifactStore:
+    """Byte-budgeted store for generated files shared by all sessions
+    
+    Files are kept in memory in least-recently-used order. When a session or the
+    whole server goes over its memory budget, the oldest files are spilled to a
+    temporary directory; when the spill area is full, the oldest spilled files
+    are dropped and must be regenerated on demand. Sessions that have not used
+    the store for session_ttl seconds are cleared.
+    """
+    
+    def __init__(self, session_budget, memory_budget, disk_budget, spill_dir=None, session_ttl=3600):
+        self.session_budget = session_budget
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self.session_ttl = session_ttl
+        self._spill_dir = spill_dir or tempfile.mkdtemp(prefix='docucraft-artifacts-')
+        os.makedirs(self._spill_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (session_id, name) -> entry, oldest first
+        self._session_bytes = {}
+        self._dropped = {}  # session_id -> {name: (filename, size)} for files that must be regenerated
+        self._last_seen = OrderedDict()  # session_id -> last access time, least recent first
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+    
+    def put(self, session_id, name, data, filename):
+        """Store a generated file, evicting older files if budgets are exceeded"""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        
+        with self._lock:
+            self._touch(session_id)
+            self._discard((session_id, name))
+            self._dropped.get(session_id, {}).pop(name, None)
+            self._entries[(session_id, name)] = {
+                'filename': filename,
+                'size': len(data),
+                'data': data,
+                'path': None,
+                'location': 'memory'
+            }
+            self._memory_bytes += len(data)
+            self._session_bytes[session_id] = self._session_bytes.get(session_id, 0) + len(data)
+            self._enforce_budgets(session_id)
+    
+    def get(self, session_id, name):
+        """Return {'data', 'filename'} for a stored file, or None if it was dropped"""
+        with self._lock:
+            self._touch(session_id)
+            entry = self._entries.get((session_id, name))
+            if entry is None:
+                return None
+            self._entries.move_to_end((session_id, name))
+            if entry['location'] == 'memory':
+                return {'data': entry['data'], 'filename': entry['filename']}
+            path = entry['path']
         
-        doc.spreadsheet.addElement(table)
+        try:
+            with open(path, 'rb') as spilled:
+                return {'data': spilled.read(), 'filename': entry['filename']}
+        except OSError:
+            # Dropped from the spill area while we were reading
+            return None
+    
+    def contains(self, session_id, name):
+        """Whether a stored file can still be downloaded (it was not dropped or expired)"""
+        with self._lock:
+            self._touch(session_id)
+            return (session_id, name) in self._entries
+    
+    def list(self, session_id):
+        """List a session's files as (name, filename, size, location) tuples"""
+        with self._lock:
+            self._touch(session_id)
+            files = [(name, entry['filename'], entry['size'], entry['location'])
+                     for (sid, name), entry in self._entries.items() if sid == session_id]
+            files.extend((name, filename, size, 'dropped')
+                         for name, (filename, size) in self._dropped.get(session_id, {}).items())
+            return files
+    
+    def usage(self, session_id=None):
+        """Report current memory and disk usage, globally and for one session"""
+        with self._lock:
+            report = {
+                'memory_bytes': self._memory_bytes,
+                'memory_budget': self.memory_budget,
+                'disk_bytes': self._disk_bytes,
+                'disk_budget': self.disk_budget,
+                'files': len(self._entries)
+            }
+            if session_id is not None:
+                self._touch(session_id)
+                report['session_memory_bytes'] = self._session_bytes.get(session_id, 0)
+                report['session_budget'] = self.session_budget
+            return report
+    
+    def clear_session(self, session_id):
+        """Remove every file belonging to a session"""
+        with self._lock:
+            self._clear(session_id)
+    
+    def _clear(self, session_id):
+        # Called with the lock held
+        for key in [key for key in self._entries if key[0] == session_id]:
+            self._discard(key)
+        self._session_bytes.pop(session_id, None)
+        self._dropped.pop(session_id, None)
+        self._last_seen.pop(session_id, None)
+    
+    def _touch(self, session_id):
+        # Called with the lock held; there is no session-end hook, so idle
+        # sessions are expired from the front of the access order instead
+        now = time.monotonic()
+        self._last_seen[session_id] = now
+        self._last_seen.move_to_end(session_id)
+        if self.session_ttl:
+            while True:
+                idle_id, last_seen = next(iter(self._last_seen.items()))
+                if now - last_seen <= self.session_ttl:
+                    break
+                self._clear(idle_id)
+    
+    def _enforce_budgets(self, session_id):
+        # Called with the lock held
+        if self._session_bytes.get(session_id, 0) > self.session_budget:
+            for key in [key for key in self._entries if key[0] == session_id]:
+                if self._session_bytes[session_id] <= self.session_budget:
+                    break
+                self._spill(key)
         
-        # Save to memory
-        ods_io = io.BytesIO()
-        doc.save(ods_io)
-        ods_io.seek(0)
-        return ods_io.getvalue()
+        if self._memory_bytes > self.memory_budget:
+            for key in list(self._entries):
+                if self._memory_bytes <= self.memory_budget:
+                    break
+                self._spill(key)
+    
+    def _spill(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry['location'] != 'memory':
+            return
+        
+        self._release_memory(key, entry)
+        
+        if entry['size'] > self.disk_budget:
+            # Could never fit, so don't drop other spilled files to make room for it
+            self._evict(key)
+            return
+        
+        # Make room in the spill area by dropping the oldest spilled files
+        if self._disk_bytes + entry['size'] > self.disk_budget:
+            for other_key, other in list(self._entries.items()):
+                if self._disk_bytes + entry['size'] <= self.disk_budget:
+                    break
+                if other['location'] == 'disk':
+                    self._evict(other_key)
+        
+        if self._disk_bytes + entry['size'] > self.disk_budget:
+            self._evict(key)
+            return
+        
+        path = os.path.join(self._spill_dir, uuid.uuid4().hex)
+        try:
+            with open(path, 'wb') as spilled:
+                spilled.write(entry.pop('data'))
+        except OSError:
+            self._evict(key)
+            return
+        
+        entry.update({'data': None, 'path': path, 'location': 'disk'})
+        self._disk_bytes += entry['size']
+    
+    def _evict(self, key):
+        # Forget the file but remember its name so the session can regenerate it
+        entry = self._entries.pop(key)
+        self._drop(entry)
+        self._dropped.setdefault(key[0], {})[key[1]] = (entry['filename'], entry['size'])
+    
+    def _drop(self, entry):
+        if entry['location'] == 'disk':
+            self._disk_bytes -= entry['size']
+            try:
+                os.remove(entry['path'])
+            except OSError:
+                pass
+        entry.update({'data': None, 'path': None})
+    
+    def _release_memory(self, key, entry):
+        self._memory_bytes -= entry['size']
+        self._session_bytes[key[0]] -= entry['size']
+    
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        if entry['location'] == 'memory':
+            self._release_memory(key, entry)
+        else:
+            self._drop(entry)
+
+class RenderCache:
+    """Content-addressed cache of rendered documents
+    
+    Keys hash the input text together with the analysis version, output format
+    and generator options. Entries live in an in-memory LRU bounded by bytes and,
+    when a directory is configured, in an on-disk tier. Both tiers expire
+    entries after ttl seconds.
+    """
+    
+    def __init__(self, memory_budget, disk_dir=None, ttl=3600, clock=time.time):
+        self.memory_budget = memory_budget
+        self.disk_dir = disk_dir
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (created, value, size), oldest first
+        self._memory_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+    
+    @staticmethod
+    def make_key(text, analysis_version, file_format, options=None):
+        """Build the cache key for rendering text in a format"""
+        digest = hashlib.sha256()
+        for part in (analysis_version, file_format, json.dumps(options or {}, sort_keys=True, default=str)):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        digest.update(text.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+    
+    def get(self, key):
+        """Return the cached rendering for key, or None on a miss"""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, value, size = entry
+                if now - created <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+        
+        value = self._disk_get(key, now)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._memory_put(key, value, now)
+        return value
+    
+    def put(self, key, value):
+        """Cache a rendering (bytes or str) under key"""
+        now = self._clock()
+        self._memory_put(key, value, now)
+        self._disk_put(key, value, now)
+    
+    def stats(self):
+        """Hit/miss counters and memory usage"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_ratio': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'memory_bytes': self._memory_bytes,
+                'memory_budget': self.memory_budget
+            }
+    
+    def _memory_put(self, key, value, now):
+        size = len(value)
+        if size > self.memory_budget:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (now, value, size)
+            self._memory_bytes += size
+            while self._memory_bytes > self.memory_budget:
+                self._remove(next(iter(self._entries)))
+    
+    def _remove(self, key):
+        # Called with the lock held
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry[2]
+    
+    def _disk_paths(self, key):
+        base = os.path.join(self.disk_dir, key)
+        return base + '.txt', base + '.bin'
+    
+    def _disk_get(self, key, now):
+        if not self.disk_dir:
+            return None
+        for path in self._disk_paths(key):
+            try:
+                if now - os.path.getmtime(path) > self.ttl:
+                    os.remove(path)
+                    continue
+                with open(path, 'rb') as cached:
+                    data = cached.read()
+            except OSError:
+                continue
+            return data.decode('utf-8') if path.endswith('.txt') else data
+        return None
+    
+    def _disk_put(self, key, value, now):
+        if not self.disk_dir:
+            return
+        text_path, binary_path = self._disk_paths(key)
+        path, data = (text_path, value.encode('utf-8')) if isinstance(value, str) else (binary_path, value)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, 'wb') as cached:
+                cached.write(data)
+            # Stamp the entry with the cache clock so TTL checks use one time source
+            os.utime(temp_path, (now, now))
+            os.replace(temp_path, path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+class IngestedFile:
+    """An uploaded text file spooled to a temporary file
+    
+    Uploads are copied to disk in fixed-size chunks, decompressing .gz and .zip
+    uploads as a stream, so neither the compressed nor the decompressed bytes
+    are ever held in memory as a whole. Large spooled files are decoded straight
+    from a memory map instead of being read into a bytes object first; the
+    decoded text is still a single str, since the analyzer works on whole
+    strings.
+    """
+    
+    CHUNK_SIZE = 1024 * 1024
+    MMAP_THRESHOLD = 8 * 1024 * 1024
+    TEXT_EXTENSIONS = ('.txt', '.csv', '.tsv', '.json', '.md', '.log')
+    
+    def __init__(self, path, name, size, compression=None):
+        self.path = path
+        self.name = name
+        self.size = size
+        self.compression = compression
+        self.encoding = None
+    
+    @classmethod
+    def from_upload(cls, fileobj, name, max_bytes, spool_dir=None, chunk_size=CHUNK_SIZE):
+        """Spool an upload to disk, raising ValueError for unsupported or oversized files"""
+        lower_name = name.lower()
+        compression = None
+        archive = None
+        if hasattr(fileobj, 'seek'):
+            fileobj.seek(0)
+        if lower_name.endswith('.gz'):
+            compression = 'gzip'
+            name = name[:-3]
+            source = gzip.GzipFile(fileobj=fileobj, mode='rb')
+        elif lower_name.endswith('.zip'):
+            compression = 'zip'
+            try:
+                archive = zipfile.ZipFile(fileobj)
+            except zipfile.BadZipFile as e:
+                raise ValueError(f"Could not read {name}: {e}") from e
+            member = cls._zip_text_member(archive)
+            if member is None:
+                raise ValueError(f"{name} does not contain a supported text file")
+            name = os.path.basename(member.filename)
+            source = archive.open(member)
+        else:
+            source = fileobj
+        
+        if not name.lower().endswith(cls.TEXT_EXTENSIONS):
+            raise ValueError(f"Unsupported file type: {name}")
+        
+        fd, path = tempfile.mkstemp(dir=spool_dir, prefix='docucraft-upload-')
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as spool:
+                while True:
+                    chunk = source.read(chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise ValueError(f"{name} is larger than the {format_bytes(max_bytes)} upload limit")
+                    spool.write(chunk)
+        except (OSError, EOFError, zipfile.BadZipFile, zlib.error) as e:
+            # Corrupt compressed data surfaces as zlib.error from the decompressing reader
+            os.remove(path)
+            raise ValueError(f"Could not read {name}: {e}") from e
+        except ValueError:
+            os.remove(path)
+            raise
+        finally:
+            # The caller's upload stays open; only the decompressing readers are closed
+            if source is not fileobj:
+                source.close()
+            if archive is not None:
+                archive.close()
+        return cls(path, name, size, compression)
+    
+    @classmethod
+    def _zip_text_member(cls, archive):
+        """First supported text file in a ZIP archive"""
+        for member in archive.infolist():
+            if member.is_dir() or member.filename.startswith('__MACOSX/'):
+                continue
+            if member.filename.lower().endswith(cls.TEXT_EXTENSIONS):
+                return member
+        return None
+    
+    def read_text(self):
+        """Decode the whole spooled file into one str (UTF-8, falling back to Latin-1)"""
+        if self.size == 0:
+            self.encoding = 'utf-8'
+            return ''
+        with open(self.path, 'rb') as f:
+            if self.size < self.MMAP_THRESHOLD:
+                return self._decode(f.read())
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                with memoryview(mapped) as view:
+                    return self._decode(view)
+    
+    def _decode(self, data):
+        try:
+            text = str(data, 'utf-8-sig')
+            self.encoding = 'utf-8'
+        except UnicodeDecodeError:
+            text = str(data, 'latin-1')
+            self.encoding = 'latin-1'
+        return text
+    
+    def close(self):
+        """Delete the spooled file"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+class MetricsRegistry:
+    """Counters and histograms exported in the Prometheus text format
+    
+    Metrics are declared up front with counter() or histogram(); each distinct
+    set of label values becomes its own series. Durations measured by timer()
+    come from the injected clock.
+    """
+    
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    
+    def __init__(self, clock=time.perf_counter, record_stages=False):
+        self._clock = clock
+        # Whether callers should trace pipeline stages to feed stage histograms
+        self.record_stages = record_stages
+        self._lock = threading.Lock()
+        self._metrics = OrderedDict()  # name -> {'type', 'help', 'buckets', 'series'}
+    
+    def counter(self, name, help_text):
+        """Declare a counter"""
+        self._metrics[name] = {'type': 'counter', 'help': help_text, 'buckets': None, 'series': {}}
+    
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        """Declare a histogram with the given upper bucket bounds"""
+        self._metrics[name] = {'type': 'histogram', 'help': help_text,
+                               'buckets': tuple(sorted(buckets)), 'series': {}}
+    
+    def inc(self, name, amount=1, **labels):
+        """Add amount to a counter series"""
+        series = self._metrics[name]['series']
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series[key] = series.get(key, 0) + amount
+    
+    def observe(self, name, value, **labels):
+        """Record one observation in a histogram series"""
+        metric = self._metrics[name]
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            entry = metric['series'].get(key)
+            if entry is None:
+                # Per-bucket counts (last slot is +Inf), sum, count
+                entry = metric['series'][key] = [[0] * (len(metric['buckets']) + 1), 0.0, 0]
+            entry[0][bisect_left(metric['buckets'], value)] += 1
+            entry[1] += value
+            entry[2] += 1
+    
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the duration of a block in a histogram, in seconds"""
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.observe(name, self._clock() - start, **labels)
+    
+    def observe_stages(self, stages):
+        """Feed StageTimings stage records into the stage latency histogram"""
+        for record in stages:
+            self.observe('docucraft_stage_duration_seconds', record['wall_ms'] / 1000, stage=record['stage'])
+    
+    def value(self, name, **labels):
+        """Current value of a counter series, or (sum, count) of a histogram series"""
+        metric = self._metrics[name]
+        with self._lock:
+            entry = metric['series'].get(tuple(sorted(labels.items())))
+            if metric['type'] == 'counter':
+                return entry or 0
+            return (entry[1], entry[2]) if entry else (0.0, 0)
+    
+    def export_prometheus(self):
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, metric in self._metrics.items():
+                lines.append(f"# HELP {name} {metric['help']}")
+                lines.append(f"# TYPE {name} {metric['type']}")
+                for key, entry in sorted(metric['series'].items()):
+                    if metric['type'] == 'counter':
+                        lines.append(f"{name}{self._format_labels(key)} {self._format_value(entry)}")
+                        continue
+                    bucket_counts, total, count = entry
+                    cumulative = 0
+                    for bound, bucket_count in zip(metric['buckets'] + ('+Inf',), bucket_counts):
+                        cumulative += bucket_count
+                        le = bound if bound == '+Inf' else self._format_value(bound)
+                        lines.append(f"{name}_bucket{self._format_labels(key + (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{self._format_labels(key)} {self._format_value(total)}")
+                    lines.append(f"{name}_count{self._format_labels(key)} {count}")
+        return '\n'.join(lines) + '\n'
+    
+    def write_file(self, path):
+        """Atomically write the exposition text to path (e.g. for a textfile collector)"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.metrics-')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(self.export_prometheus())
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    
+    def start_file_writer(self, path, interval):
+        """Rewrite path every interval seconds from a daemon thread; set the returned event to stop"""
+        stop = threading.Event()
+        def write_periodically():
+            while not stop.wait(interval):
+                try:
+                    self.write_file(path)
+                except OSError:
+                    pass
+        threading.Thread(target=write_periodically, name='docucraft-metrics-file', daemon=True).start()
+        return stop
+    
+    def serve(self, host, port):
+        """Serve the registry at http://host:port/metrics from a daemon thread"""
+        registry = self
+        
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.export_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name='docucraft-metrics-http', daemon=True).start()
+        return server
+    
+    @staticmethod
+    def _format_labels(key):
+        if not key:
+            return ''
+        pairs = []
+        for label, value in key:
+            value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            pairs.append(f'{label}="{value}"')
+        return '{' + ','.join(pairs) + '}'
+    
+    @staticmethod
+    def _format_value(value):
+        return repr(float(value)) if isinstance(value, float) else str(value)
+
+# Bump when analysis output changes so cached renders are not reused
+ANALYSIS_VERSION = "v3_table_regions_markdown_tfidf_sentences"
 
 # Initialize components
 @st.cache_resource
-def get_analyzer(version="v2_with_json_detection"):
+def get_analyzer(version=ANALYSIS_VERSION):
     """Get TextAnalyzer instance with JSON detection capability"""
     return TextAnalyzer()
 
-def get_generator():
-    """Get DocumentGenerator instance with preview capabilities"""
-    return DocumentGenerator()
+@st.cache_resource
+def get_generator(reproducible=False):
+    """Get shared DocumentGenerator instance with preview capabilities"""
+    return DocumentGenerator(reproducible=reproducible)
+
+@st.cache_resource
+def get_artifact_store():
+    """Get the process-wide store for generated files"""
+    megabyte = 1024 * 1024
+    return ArtifactStore(
+        session_budget=int(os.environ.get('DOCUCRAFT_SESSION_ARTIFACT_MB', 64)) * megabyte,
+        memory_budget=int(os.environ.get('DOCUCRAFT_ARTIFACT_MEMORY_MB', 512)) * megabyte,
+        disk_budget=int(os.environ.get('DOCUCRAFT_ARTIFACT_DISK_MB', 2048)) * megabyte,
+        spill_dir=os.environ.get('DOCUCRAFT_ARTIFACT_SPILL_DIR'),
+        session_ttl=int(os.environ.get('DOCUCRAFT_SESSION_TTL_MINUTES', 60)) * 60
+    )
+
+@st.cache_resource
+def get_render_cache():
+    """Get the process-wide cache of rendered documents"""
+    return RenderCache(
+        memory_budget=int(os.environ.get('DOCUCRAFT_RENDER_CACHE_MB', 256)) * 1024 * 1024,
+        disk_dir=os.environ.get('DOCUCRAFT_RENDER_CACHE_DIR'),
+        ttl=int(os.environ.get('DOCUCRAFT_RENDER_CACHE_TTL', 3600))
+    )
+
+@st.cache_resource
+def get_admission_policy():
+    """Get the per-request input limits beyond which analysis is degraded"""
+    return AdmissionPolicy(
+        max_chars=int(os.environ.get('DOCUCRAFT_MAX_INPUT_CHARS', 20000000)),
+        max_lines=int(os.environ.get('DOCUCRAFT_MAX_INPUT_LINES', 2000000)),
+        max_memory_bytes=int(os.environ.get('DOCUCRAFT_MAX_ANALYSIS_MB', 512)) * 1024 * 1024,
+        sample_chars=int(os.environ.get('DOCUCRAFT_DEGRADED_SAMPLE_CHARS', 1000000))
+    )
+
+@st.cache_resource
+def get_metrics():
+    """Get the process-wide metrics registry, starting any configured exporters"""
+    port = os.environ.get('DOCUCRAFT_METRICS_PORT')
+    path = os.environ.get('DOCUCRAFT_METRICS_FILE')
+    # Stage latencies need stage tracing, so only pay for it when metrics are exported
+    metrics = MetricsRegistry(record_stages=bool(port or path))
+    metrics.counter('docucraft_analyses_total', 'Text analyses by detected content type')
+    metrics.counter('docucraft_partial_analyses_total', 'Text analyses that ran out of time budget')
+    metrics.counter('docucraft_degraded_analyses_total', 'Text analyses of inputs over the admission limits')
+    metrics.counter('docucraft_conversions_total', 'Documents rendered by output format')
+    metrics.counter('docucraft_render_cache_hits_total', 'Conversions served from the render cache')
+    metrics.counter('docucraft_render_cache_misses_total', 'Conversions that had to be generated')
+    metrics.counter('docucraft_input_bytes_total', 'Bytes of text analyzed')
+    metrics.counter('docucraft_output_bytes_total', 'Bytes of documents rendered by output format')
+    metrics.histogram('docucraft_analysis_duration_seconds', 'Time to analyze a text')
+    metrics.histogram('docucraft_conversion_duration_seconds', 'Time to render a document by output format')
+    metrics.histogram('docucraft_stage_duration_seconds', 'Time spent in each analyzer and generator stage')
+    
+    if port:
+        metrics.serve(os.environ.get('DOCUCRAFT_METRICS_HOST', '127.0.0.1'), int(port))
+    if path:
+        metrics.start_file_writer(path, float(os.environ.get('DOCUCRAFT_METRICS_INTERVAL', 15)))
+    return metrics
+
+def record_memory_profile(profile):
+    """Append a finished memory profile to the report file, if one is configured"""
+    report_file = os.environ.get('DOCUCRAFT_MEMORY_REPORT_FILE')
+    if report_file:
+        try:
+            profile.write_report(report_file)
+        except OSError:
+            pass
+    return profile.result
 
-def create_download_link(file_data, filename, file_format):
-    """Create download link for generated file"""
-    if isinstance(file_data, str):
-        file_data = file_data.encode()
+# Texts longer than this are shown as a read-only preview instead of an editable text area
+TEXT_AREA_MAX_CHARS = int(os.environ.get('DOCUCRAFT_TEXT_AREA_MAX_CHARS', 200000))
+
+def ingest_upload(uploaded_file):
+    """Spool and decode an uploaded file, returning (text, details)"""
+    with IngestedFile.from_upload(
+        uploaded_file, uploaded_file.name,
+        max_bytes=int(os.environ.get('DOCUCRAFT_UPLOAD_MAX_MB', 200)) * 1024 * 1024,
+        spool_dir=os.environ.get('DOCUCRAFT_UPLOAD_DIR')
+    ) as ingested:
+        text = ingested.read_text()
+        return text, {
+            'name': ingested.name,
+            'size': ingested.size,
+            'compression': ingested.compression,
+            'encoding': ingested.encoding
+        }
+
+def run_analysis(text, collect_timings=False, profile_memory=False):
+    """Analyze text with the shared analyzer, recording metrics
     
-    b64 = base64.b64encode(file_data).decode()
+    The text is checked against the admission limits first; inputs over them
+    are analyzed in degraded mode. With profile_memory, the result gains a
+    'memory_profile' section.
+    """
+    metrics = get_metrics()
+    admission = get_admission_policy().check(text)
+    input_bytes = admission['bytes']
+    profile = MemoryProfile('analysis', input_bytes) if profile_memory else None
+    # Profiled runs are much slower, so they stay out of the latency histograms
+    with profile.measure() if profile else metrics.timer('docucraft_analysis_duration_seconds'):
+        result = get_analyzer().analyze_text_structure(
+            text, collect_timings=collect_timings or (metrics.record_stages and not profile),
+            admission=admission)
+    
+    if 'timings' in result:
+        if not profile:
+            metrics.observe_stages(result['timings']['stages'])
+        if not collect_timings:
+            del result['timings']
+    if profile:
+        result['memory_profile'] = record_memory_profile(profile)
+    metrics.inc('docucraft_analyses_total', content_type=result['content_type'])
+    if result.get('partial'):
+        metrics.inc('docucraft_partial_analyses_total')
+    if result.get('degraded'):
+        metrics.inc('docucraft_degraded_analyses_total')
+    metrics.inc('docucraft_input_bytes_total', input_bytes)
+    return result
+
+# Output formats: generator method and file extension
+DOCUMENT_FORMATS = {
+    'Word (.docx)': ('generate_word_document', 'docx'),
+    'PDF': ('generate_pdf_document', 'pdf'),
+    'Excel (.xlsx)': ('generate_excel_document', 'xlsx'),
+    'CSV': ('generate_csv_document', 'csv'),
+    'JSON': ('generate_json_document', 'json'),
+    'ODS': ('generate_ods_document', 'ods'),
+    'SQLite': ('generate_sqlite_document', 'sqlite')
+}
+
+def render_document(file_format, analysis, text, options=None, timings=None, memory_profile=None):
+    """Render text in a format, serving repeat conversions from the render cache
     
-    mime_types = {
-        'Word (.docx)': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-        'PDF': 'application/pdf',
-        'Excel (.xlsx)': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        'CSV': 'text/csv',
-        'JSON': 'application/json',
-        'ODS': 'application/vnd.oasis.opendocument.spreadsheet'
-    }
+    Returns (file_data, cache_hit). Generator stages are recorded into timings
+    when a StageTimings is given. When a MemoryProfile is given the document is
+    always generated (never read from the cache) so its peak is measured.
+    """
+    metrics = get_metrics()
+    extension = DOCUMENT_FORMATS[file_format][1]
+    
+    if memory_profile is not None:
+        # Profiled runs are much slower, so they stay out of the latency histograms
+        with memory_profile.measure(), timings.activate() if timings else nullcontext():
+            file_data, cache_hit = _render_document(file_format, analysis, text, options, use_cache=False)
+        record_memory_profile(memory_profile)
+    else:
+        if timings is None and metrics.record_stages:
+            timings = StageTimings()
+        with metrics.timer('docucraft_conversion_duration_seconds', format=extension):
+            if timings is None:
+                file_data, cache_hit = _render_document(file_format, analysis, text, options)
+            else:
+                with timings.activate():
+                    file_data, cache_hit = _render_document(file_format, analysis, text, options)
+                metrics.observe_stages(timings.stages)
     
-    mime_type = mime_types.get(file_format, 'application/octet-stream')
-    
-    return f"""
-    <a href="data:{mime_type};base64,{b64}" download="{filename}" 
-       style="
-           display: inline-block;
-           padding: 0.75rem 1.5rem;
-           background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-           color: white;
-           text-decoration: none;
-           border-radius: 10px;
-           font-weight: bold;
-           box-shadow: 0 4px 15px rgba(0, 0, 0, 0.2);
-           transition: transform 0.3s ease;
-       "
-       onmouseover="this.style.transform='translateY(-2px)'"
-       onmouseout="this.style.transform='translateY(0px)'">
-        📥 Download {file_format}
-    </a>
+    metrics.inc('docucraft_conversions_total', format=extension)
+    if cache_hit:
+        metrics.inc('docucraft_render_cache_hits_total', format=extension)
+    else:
+        metrics.inc('docucraft_render_cache_misses_total', format=extension)
+    size = len(file_data.encode('utf-8')) if isinstance(file_data, str) else len(file_data)
+    metrics.inc('docucraft_output_bytes_total', size, format=extension)
+    return file_data, cache_hit
+
+def _render_document(file_format, analysis, text, options, use_cache=True):
+    """Render through the render cache, returning (file_data, cache_hit)
+    
+    Renders of partial analyses are neither read from nor written to the
+    cache: what their deadline skipped depends on timing, not on the text.
     """
+    cache = get_render_cache()
+    cacheable = not analysis.get('partial')
+    analysis_version = ANALYSIS_VERSION
+    if analysis.get('degraded'):
+        # Degraded analyses only saw a sample of the text, so they get their own entries
+        analysis_version = f"{ANALYSIS_VERSION}+degraded:{analysis['degraded']['sample_chars']}"
+    key = cache.make_key(text, analysis_version, file_format, options)
+    file_data = cache.get(key) if use_cache and cacheable else None
+    if file_data is not None:
+        return file_data, True
+    
+    method_name, _ = DOCUMENT_FORMATS[file_format]
+    options = options or {}
+    generator = get_generator(reproducible=bool(options.get('reproducible')))
+    # Remaining options are keyword arguments of the format's generator method
+    format_options = {name: value for name, value in options.items() if name != 'reproducible'}
+    file_data = getattr(generator, method_name)(analysis, text, **format_options)
+    if cacheable:
+        cache.put(key, file_data)
+    return file_data, False
+
+MIME_TYPES = {
+    'Word (.docx)': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'PDF': 'application/pdf',
+    'Excel (.xlsx)': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'CSV': 'text/csv',
+    'JSON': 'application/json',
+    'ODS': 'application/vnd.oasis.opendocument.spreadsheet',
+    'SQLite': 'application/vnd.sqlite3'
+}
+
+def format_bytes(num_bytes):
+    """Format a byte count for display"""
+    for unit in ['B', 'KB', 'MB']:
+        if num_bytes < 1024:
+            return f"{num_bytes:.0f} {unit}" if unit == 'B' else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} GB"
+
+def show_download_button(session_id, file_format, filename, key):
+    """Show a download button that sends the file only when it is clicked"""
+    store = get_artifact_store()
+    if not store.contains(session_id, file_format):
+        # Dropped under storage pressure or expired with an idle session
+        st.warning(f"⚠️ The {file_format} file is no longer stored. Regenerate it to download it.")
+        
+        def regenerate():
+            st.session_state.pending_format = file_format
+        
+        # A callback, since the button may not be rendered again on the rerun its click triggers
+        st.button("♻️ Regenerate", key=f"regenerate_{key}", on_click=regenerate, use_container_width=True)
+        return
+    
+    def load_file():
+        file_info = store.get(session_id, file_format)
+        if file_info is None:
+            # Dropped after the page was rendered; fail the download rather than send an empty file
+            raise FileNotFoundError(f"{filename} is no longer stored, regenerate it")
+        return file_info['data']
+    
+    # Deferred data keeps the file out of the page payload, so reruns stay
+    # the same size however many files have been generated
+    st.download_button(
+        f"📥 Download {file_format}",
+        data=load_file,
+        file_name=filename,
+        mime=MIME_TYPES.get(file_format, 'application/octet-stream'),
+        key=key,
+        on_click="ignore",
+        type="primary",
+        use_container_width=True
+    )
 
 def main():
     # Copyright footer
@@ -2131,8 +4772,9 @@ def main():
         st.session_state.text_input = ""
     if 'analysis_result' not in st.session_state:
         st.session_state.analysis_result = None
-    if 'generated_files' not in st.session_state:
-        st.session_state.generated_files = {}
+    if 'session_id' not in st.session_state:
+        # Key for this session's files in the shared artifact store
+        st.session_state.session_id = uuid.uuid4().hex
     
     # Main content based on selected tab
     if selected_tab == "📝 Text Input":
@@ -2144,37 +4786,151 @@ def main():
     else:
         show_about_tab()
 
+def show_live_analysis(text):
+    """Live summary from the cheap detectors, refreshed once the text stops changing
+    
+    A change marks the summary stale, and while it is stale a timer fragment
+    ticks every debounce period; the detectors only run when a tick finds the
+    text unchanged for a full period, so bursts of edits cost one run. Once
+    the summary is current the timer is no longer rendered, so idle pages stop
+    polling.
+    """
+    live = st.session_state.get('live_analysis_state')
+    if live is None:
+        live = st.session_state.live_analysis_state = {
+            'analysis': LiveAnalysis(get_analyzer()), 'text': None, 'changed_at': 0.0, 'stale': False, 'summary': None
+        }
+    
+    if text != live['text']:
+        live['text'], live['changed_at'], live['stale'] = text, time.monotonic(), bool(text.strip())
+        if not live['stale']:
+            live['summary'] = None
+    
+    if live['stale']:
+        refresh_live_analysis(text)
+    else:
+        show_live_summary(live)
+
+@st.fragment(run_every=LIVE_ANALYSIS_DEBOUNCE)
+def refresh_live_analysis(text):
+    """Timer fragment that re-runs the detectors once the text has settled"""
+    live = st.session_state.live_analysis_state
+    if live['stale'] and time.monotonic() - live['changed_at'] >= LIVE_ANALYSIS_DEBOUNCE:
+        live['stale'] = False
+        if get_admission_policy().check(text)['degraded']:
+            live['summary'] = {'too_large': True}
+        else:
+            live['summary'] = live['analysis'].summarize(text)
+    
+    if not live['stale']:
+        # Frontend timers are reset on every full run, so rerunning the app
+        # without this fragment is what stops the polling
+        st.rerun()
+    show_live_summary(live)
+
+def show_live_summary(live):
+    """Caption with the latest live summary"""
+    summary = live['summary']
+    pending = " · ⏳ updating..." if live['stale'] else ""
+    if summary is None:
+        st.caption(f"⚡ Live analysis: waiting for text{pending}")
+    elif summary.get('too_large'):
+        st.caption(f"⚡ Live analysis: this text is over the analysis limits, so use the full analysis{pending}")
+    else:
+        separator = {'\t': 'tab', ' ': 'space'}.get(summary['separator'], summary['separator'])
+        table_note = f"`{separator}`-separated table · " if separator else ""
+        st.caption(
+            f"⚡ Live: **{summary['content_type'].replace('_', ' ').title()}** · {table_note}"
+            f"{summary['headings']} headings · {summary['lists']} lists ({summary['list_items']} items) · "
+            f"{summary['latency_ms']:.0f} ms{pending}"
+        )
+
 def show_text_input_tab():
     st.markdown('<div class="content-container">', unsafe_allow_html=True)
     
     st.markdown("### 📝 Enter Your Raw Text")
     st.markdown("Paste your content below and let our AI analyze its structure to suggest the best document format.")
     
-    # Text input area
-    text_input = st.text_area(
-        "Your Text Content",
-        value=st.session_state.text_input,
-        height=300,
-        placeholder="Paste your raw text here...\n\nExamples:\n• Tabular data (comma/tab separated)\n• Documents with headings\n• Lists and bullet points\n• Mixed content\n\nThe AI will automatically detect the structure and suggest optimal formats.",
-        help="Enter any type of text content. The system will automatically analyze its structure."
+    # File upload (spooled to disk in chunks; .gz/.zip are decompressed as a stream)
+    uploaded_file = st.file_uploader(
+        "📂 Or upload a file",
+        type=["txt", "csv", "tsv", "json", "md", "log", "gz", "zip"],
+        help="Text, CSV, TSV, JSON, Markdown or log files, optionally gzip- or zip-compressed"
     )
+    if uploaded_file is not None and uploaded_file.file_id != st.session_state.get('uploaded_file_id'):
+        try:
+            with st.spinner(f"📂 Reading {uploaded_file.name}..."):
+                st.session_state.text_input, st.session_state.upload_details = ingest_upload(uploaded_file)
+        except ValueError as e:
+            st.error(f"⚠️ {e}")
+        st.session_state.uploaded_file_id = uploaded_file.file_id
+    
+    if uploaded_file is not None and st.session_state.get('upload_details'):
+        details = st.session_state.upload_details
+        compression = f", {details['compression']}-compressed" if details['compression'] else ""
+        st.caption(f"📂 Loaded {details['name']} ({format_bytes(details['size'])}{compression}, {details['encoding']})")
+    
+    if len(st.session_state.text_input) > TEXT_AREA_MAX_CHARS:
+        # Large texts stay server-side; the browser only gets a read-only preview
+        st.text_area(
+            "Your Text Content (preview)",
+            value=st.session_state.text_input[:TEXT_AREA_MAX_CHARS],
+            height=300,
+            disabled=True,
+            help=f"Only the first {TEXT_AREA_MAX_CHARS:,} characters are shown; the whole text is analyzed."
+        )
+        text_input = st.session_state.text_input
+    else:
+        # Text input area
+        text_input = st.text_area(
+            "Your Text Content",
+            value=st.session_state.text_input,
+            height=300,
+            placeholder="Paste your raw text here...\n\nExamples:\n• Tabular data (comma/tab separated)\n• Documents with headings\n• Lists and bullet points\n• Mixed content\n\nThe AI will automatically detect the structure and suggest optimal formats.",
+            help="Enter any type of text content. The system will automatically analyze its structure."
+        )
     
     col1, col2 = st.columns(2)
     
     with col1:
+        # Kept outside widget state so the Generate tab still sees it
+        st.session_state.collect_timings = st.toggle(
+            "⏱️ Record stage timings",
+            value=st.session_state.get('collect_timings', TIMINGS_ENABLED),
+            help="Time each detector and generator stage; the breakdown appears in the Analysis tab"
+        )
+        st.session_state.profile_memory = st.toggle(
+            "🧮 Profile memory",
+            value=st.session_state.get('profile_memory', MEMORY_PROFILE_ENABLED),
+            help="Trace allocations to report peak memory and the top allocation sites (slows processing down)"
+        )
+        st.session_state.live_analysis = st.toggle(
+            "⚡ Live analysis",
+            value=st.session_state.get('live_analysis', LIVE_ANALYSIS_ENABLED),
+            help="Re-run the fast detectors whenever the text changes; the full analysis still runs on demand"
+        )
+        if st.session_state.live_analysis:
+            show_live_analysis(text_input)
+        
         if st.button("🔍 Analyze Text", type="primary", use_container_width=True):
             if text_input.strip():
                 st.session_state.text_input = text_input
                 
                 with st.spinner("🧠 Analyzing text structure..."):
-                    analyzer = get_analyzer()  # Now using versioned cache with JSON detection
-                    analysis_result = analyzer.analyze_text_structure(text_input)
+                    analysis_result = run_analysis(
+                        text_input, collect_timings=st.session_state.get('collect_timings', False),
+                        profile_memory=st.session_state.get('profile_memory', False))
                     st.session_state.analysis_result = analysis_result
+                    st.session_state.generation_timings = {}
+                    st.session_state.generation_memory_profiles = {}
                 
                 st.success("✅ Analysis complete! Check the Analysis tab to see results.")
+                if analysis_result.get('degraded'):
+                    st.warning("🛡️ This text is over the analysis limits, so it was analyzed in degraded mode. "
+                               "The Analysis tab explains what was cut back.")
             else:
                 st.error("⚠️ Please enter some text to analyze.")
-    
+        
     with col2:
         sample_options = st.selectbox(
             "📋 Choose Sample Data",
@@ -2496,6 +5252,17 @@ def show_analysis_tab():
     
     st.markdown("### 🔍 Text Analysis Results")
     
+    if analysis.get('partial'):
+        skipped = ', '.join(f"`{stage}`" for stage in analysis.get('skipped_stages', []))
+        st.warning(f"⏳ Analysis ran out of its time budget, so some AI strategies were skipped: {skipped}. "
+                   "Results come from the faster detectors only.")
+    
+    degraded = analysis.get('degraded')
+    if degraded:
+        actions = '\n'.join(f"- {action}" for action in degraded['actions'])
+        st.warning(f"🛡️ This text exceeds the analysis limits: {'; '.join(degraded['reasons'])}. "
+                   f"It was analyzed in degraded mode:\n{actions}")
+    
     # Overview metrics
     col1, col2, col3, col4 = st.columns(4)
     
@@ -2525,10 +5292,12 @@ def show_analysis_tab():
         """, unsafe_allow_html=True)
     
     with col4:
+        # Degraded analyses skip the readability score
+        readability = f"{stats['readability_score']:.0f}" if 'readability_score' in stats else 'n/a'
         st.markdown(f"""
         <div class="metric-card">
             <h3>📖 Readability</h3>
-            <p style="font-size: 1.2em; font-weight: bold;">{stats.get('readability_score', 0):.0f}</p>
+            <p style="font-size: 1.2em; font-weight: bold;">{readability}</p>
         </div>
         """, unsafe_allow_html=True)
     
@@ -2592,6 +5361,21 @@ def show_analysis_tab():
             </div>
             """, unsafe_allow_html=True)
             
+            tables = structure.get('tables', [])
+            if len(tables) > 1:
+                with st.expander(f"🗂️ **{len(tables)} Table Regions** (one sheet each in Excel/ODS)", expanded=False):
+                    st.dataframe(pd.DataFrame([
+                        {
+                            'Sheet': f"Table {number}",
+                            'Lines': f"{table['span'][0]}-{table['span'][1]}",
+                            'Separator': repr(table['separator']),
+                            'Columns': table['num_columns'],
+                            'Rows': table['num_rows'],
+                            'Header': ', '.join(table['header'])
+                        }
+                        for number, table in enumerate(tables, 1)
+                    ]), use_container_width=True, hide_index=True)
+            
             if table_data.get('header'):
                 with st.expander("👀 **View Table Preview**", expanded=False):
                     headers = table_data['header']
@@ -2747,7 +5531,7 @@ def show_analysis_tab():
         
         # Text statistics
         stats = structure.get('stats', {})
-        if stats:
+        if 'readability_score' in stats:
             readability = stats.get('readability_score', 0)
             readability_level = ("Very Easy" if readability >= 70 else 
                                "Easy" if readability >= 60 else 
@@ -2776,6 +5560,45 @@ def show_analysis_tab():
             </div>
             """, unsafe_allow_html=True)
     
+    # Stage timings (only present when recording was enabled)
+    timing_runs = []
+    if analysis.get('timings'):
+        timing_runs.append(("Analysis", analysis['timings']))
+    for fmt, fmt_timings in st.session_state.get('generation_timings', {}).items():
+        timing_runs.append((f"{fmt} generation", fmt_timings))
+    
+    if timing_runs:
+        with st.expander("⏱️ **Stage Timings**", expanded=False):
+            for label, run in timing_runs:
+                st.markdown(f"**{label}** — {run['total_wall_ms']:.1f} ms wall, {run['total_cpu_ms']:.1f} ms CPU")
+                st.dataframe(pd.DataFrame([{
+                    'Stage': '\u2003' * record['depth'] + record['stage'],
+                    'Wall (ms)': round(record['wall_ms'], 2),
+                    'CPU (ms)': round(record['cpu_ms'], 2),
+                    'Input': f"{record['input_size']:,} {record['input_unit']}" if record['input_size'] is not None else ''
+                } for record in run['stages']]), hide_index=True, use_container_width=True)
+    
+    # Memory profiles (only present when profiling was enabled)
+    memory_runs = []
+    if analysis.get('memory_profile'):
+        memory_runs.append(("Analysis", analysis['memory_profile']))
+    for fmt, fmt_profile in st.session_state.get('generation_memory_profiles', {}).items():
+        memory_runs.append((f"{fmt} generation", fmt_profile))
+    
+    if memory_runs:
+        with st.expander("🧮 **Memory Profile**", expanded=False):
+            for label, profile in memory_runs:
+                ratio = profile['bytes_per_input_byte']
+                st.markdown(f"**{label}** — peak {format_bytes(profile['peak_bytes'])} "
+                            f"for {format_bytes(profile['input_bytes'])} of input"
+                            + (f" ({ratio:.1f} bytes per input byte)" if ratio is not None else ""))
+                if profile['top_allocations']:
+                    st.dataframe(pd.DataFrame([{
+                        'Allocation site': site['site'],
+                        'Size': format_bytes(site['size_bytes']),
+                        'Blocks': site['count']
+                    } for site in profile['top_allocations']]), hide_index=True, use_container_width=True)
+    
     st.markdown('</div>', unsafe_allow_html=True)
 
 def show_generate_tab():
@@ -2804,13 +5627,35 @@ def show_generate_tab():
     # Format selection
     st.markdown("### 🎨 Choose Document Format")
     
-    available_formats = ["Word (.docx)", "PDF", "Excel (.xlsx)", "CSV", "JSON", "ODS"]
+    available_formats = list(DOCUMENT_FORMATS)
+    if analysis.get('degraded'):
+        # Inputs over the admission limits only get formats that stream their rows
+        available_formats = analysis['degraded']['formats']
+        st.caption("🛡️ This text was analyzed in degraded mode, so only streaming formats are available.")
     
     col1, col2, col3 = st.columns(3)
     format_cols = [col1, col2, col3]
     
+    store = get_artifact_store()
+    session_id = st.session_state.session_id
     selected_format = None
     
+    reproducible = st.toggle(
+        "🔁 Reproducible output",
+        key="reproducible_output",
+        help="Stamp a fixed timestamp and fixed ZIP/PDF metadata so the same text always produces byte-identical files"
+    )
+    
+    table_data = analysis['structure'].get('table_data', {})
+    sqlite_index_columns = []
+    if table_data.get('is_table') and table_data.get('header'):
+        sqlite_index_columns = st.multiselect(
+            "🗂️ SQLite index columns",
+            [str(header) for header in table_data['header']],
+            key="sqlite_index_columns",
+            help="Columns to index in the SQLite database output"
+        )
+    
     for i, fmt in enumerate(available_formats):
         with format_cols[i % 3]:
             # Get suggestion score for this format
@@ -2834,6 +5679,9 @@ def show_generate_tab():
             if st.button(f"{icon} {fmt}", key=f"format_{i}", use_container_width=True):
                 selected_format = fmt
     
+    if not selected_format:
+        selected_format = st.session_state.pop('pending_format', None)
+    
     # Generate document if format selected
     if selected_format:
         st.markdown(f"### 🔄 Generating {selected_format} Document...")
@@ -2844,42 +5692,39 @@ def show_generate_tab():
         try:
             with st.spinner(f"Creating professional {selected_format} document..."):
                 
-                # Generate based on selected format
-                if selected_format == "Word (.docx)":
-                    file_data = generator.generate_word_document(analysis, st.session_state.text_input)
-                    filename = f"document_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-                
-                elif selected_format == "PDF":
-                    file_data = generator.generate_pdf_document(analysis, st.session_state.text_input)
-                    filename = f"document_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-                
-                elif selected_format == "Excel (.xlsx)":
-                    file_data = generator.generate_excel_document(analysis, st.session_state.text_input)
-                    filename = f"document_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+                # Generate based on selected format (repeat conversions come from the cache)
+                timings = StageTimings() if st.session_state.get('collect_timings') else None
+                memory_profile = None
+                if st.session_state.get('profile_memory'):
+                    memory_profile = MemoryProfile(selected_format,
+                                                   len(st.session_state.text_input.encode('utf-8', 'surrogatepass')))
+                options = {'reproducible': reproducible}
+                if selected_format == 'SQLite' and sqlite_index_columns:
+                    options['index_columns'] = sqlite_index_columns
+                file_data, cache_hit = render_document(selected_format, analysis, st.session_state.text_input,
+                                                       options=options, timings=timings, memory_profile=memory_profile)
+                if timings is not None:
+                    st.session_state.setdefault('generation_timings', {})[selected_format] = timings.as_dict()
+                if memory_profile is not None:
+                    st.session_state.setdefault('generation_memory_profiles', {})[selected_format] = memory_profile.result
+                extension = DOCUMENT_FORMATS[selected_format][1]
+                filename = f"document_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
                 
-                elif selected_format == "CSV":
-                    file_data = generator.generate_csv_document(analysis, st.session_state.text_input)
-                    filename = f"document_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-                
-                elif selected_format == "JSON":
-                    file_data = generator.generate_json_document(analysis, st.session_state.text_input)
-                    filename = f"document_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-                
-                elif selected_format == "ODS":
-                    file_data = generator.generate_ods_document(analysis, st.session_state.text_input)
-                    filename = f"document_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ods"
-                
-                # Store generated file
-                st.session_state.generated_files[selected_format] = {
-                    'data': file_data,
-                    'filename': filename
-                }
+                # Store generated file (may be spilled to disk under memory pressure)
+                store.put(session_id, selected_format, file_data, filename)
             
             st.success(f"✅ {selected_format} document generated successfully!")
+            if cache_hit:
+                st.caption("⚡ Served from the render cache")
             
             # Show preview for all formats
             st.markdown("### 👀 Document Preview")
             
+            table_data = analysis['structure'].get('table_data', {})
+            preview_table = None
+            if analysis['content_type'] in ['tabular', 'mixed_tabular'] and table_data.get('is_table'):
+                preview_table = table_data
+            
             if selected_format in ["Word (.docx)", "PDF"]:
                 # Generate HTML preview for document formats
                 preview_html = generator.generate_preview_html(analysis, st.session_state.text_input)
@@ -2890,6 +5735,17 @@ def show_generate_tab():
                     st.markdown('</div>', unsafe_allow_html=True)
                     st.info("📋 This preview shows how your content will be formatted in the generated document.")
             
+            elif selected_format in ["CSV", "Excel (.xlsx)", "SQLite"] and preview_table is not None:
+                # Tabular files hold exactly the detected table, so preview it without re-parsing the file
+                with st.expander("📊 **Data Content Preview**", expanded=True):
+                    st.dataframe(table_frame(preview_table['rows'][:10], preview_table['header']),
+                                 use_container_width=True)
+                    if len(preview_table['rows']) > 10:
+                        st.info(f"📋 Showing first 10 rows of {len(preview_table['rows'])} total rows.")
+            
+            elif analysis.get('degraded'):
+                st.info("📋 Previews of whole documents are skipped for text analyzed in degraded mode.")
+            
             elif selected_format in ["CSV", "JSON"]:
                 with st.expander("📊 **Data Content Preview**", expanded=True):
                     if selected_format == "CSV":
@@ -2923,32 +5779,50 @@ def show_generate_tab():
                     else:
                         st.info("📋 ODS file generated successfully. Preview not available for this format.")
             
+            elif selected_format == "SQLite":
+                st.info("🗂️ SQLite database generated with a generated_data table of the text lines.")
+            
             # Download button
             st.markdown("### 📥 Download Your Document")
-            download_link = create_download_link(file_data, filename, selected_format)
-            st.markdown(download_link, unsafe_allow_html=True)
+            show_download_button(session_id, selected_format, filename,
+                                 key=f"download_new_{selected_format}")
             
         except Exception as e:
             st.error(f"❌ Error generating {selected_format}: {str(e)}")
             st.info("Please try a different format or check your input text.")
     
     # Show previously generated files
-    if st.session_state.generated_files:
+    generated_files = store.list(session_id)
+    if generated_files:
         st.markdown("### 📁 Previously Generated Files")
         
-        for fmt, file_info in st.session_state.generated_files.items():
+        for fmt, filename, size, location in generated_files:
             col1, col2 = st.columns([3, 1])
             
             with col1:
-                st.write(f"📄 **{fmt}** - {file_info['filename']}")
+                location_note = {"memory": "", "disk": " · 💾 on disk", "dropped": " · ♻️ evicted"}[location]
+                st.write(f"📄 **{fmt}** - {filename} ({format_bytes(size)}{location_note})")
             
             with col2:
-                download_link = create_download_link(
-                    file_info['data'], 
-                    file_info['filename'], 
-                    fmt
-                )
-                st.markdown(download_link, unsafe_allow_html=True)
+                if location == 'dropped':
+                    # Evicted under storage pressure; regenerate from the current analysis
+                    if st.button("♻️ Regenerate", key=f"regenerate_{fmt}", use_container_width=True):
+                        st.session_state.pending_format = fmt
+                        st.rerun()
+                else:
+                    show_download_button(session_id, fmt, filename, key=f"download_{fmt}")
+        
+        usage = store.usage(session_id)
+        st.caption(
+            f"Session storage: {format_bytes(usage['session_memory_bytes'])} of "
+            f"{format_bytes(usage['session_budget'])} in memory · Server: "
+            f"{format_bytes(usage['memory_bytes'])} in memory, {format_bytes(usage['disk_bytes'])} spilled to disk"
+        )
+        cache_stats = get_render_cache().stats()
+        st.caption(
+            f"Render cache: {cache_stats['hits'] + cache_stats['disk_hits']} hits, "
+            f"{cache_stats['misses']} misses ({cache_stats['hit_ratio']:.0%} hit ratio)"
+        )
     
     st.markdown('</div>', unsafe_allow_html=True)
 
@@ -2974,6 +5848,7 @@ def show_about_tab():
     - **CSV**: Clean data export for analysis
     - **JSON**: Structured data for applications
     - **ODS**: Open Document Spreadsheet format
+    - **SQLite**: Queryable database file for large tables
     
     🎨 **Beautiful Design**
     - Modern, responsive interface
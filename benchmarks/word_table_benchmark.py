@@ -0,0 +1,100 @@
+"""Benchmark Word table generation before and after bulk XML row construction.
+
+Compares the previous per-row ``table.add_row().cells`` approach with the
+bulk builder used by ``DocumentGenerator._add_table_to_word`` and prints how
+the cost grows as the row count doubles.
+
+Usage:
+    python benchmarks/word_table_benchmark.py
+    python benchmarks/word_table_benchmark.py --rows 1000 2000 4000 8000 --skip-legacy-above 4000
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+import warnings
+
+# Importing app outside `streamlit run` logs bare-mode warnings
+warnings.filterwarnings('ignore')
+logging.disable(logging.WARNING)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+
+from app import DocumentGenerator
+
+
+def legacy_add_table_to_word(generator, doc, table_data):
+    """Per-row table construction as it was before the bulk builder"""
+    headers = table_data['header']
+    rows = table_data['rows']
+
+    doc.add_heading('Data Table', level=1)
+    table = doc.add_table(rows=1, cols=len(headers))
+    table.style = 'Table Grid'
+
+    header_cells = table.rows[0].cells
+    for i, header in enumerate(headers):
+        header_cells[i].text = str(header)
+        for paragraph in header_cells[i].paragraphs:
+            for run in paragraph.runs:
+                run.font.bold = True
+                run.font.color.rgb = generator.color_schemes['professional']['primary']
+
+    for row_data in rows:
+        row_cells = table.add_row().cells
+        for i, cell_data in enumerate(row_data):
+            if i < len(row_cells):
+                row_cells[i].text = str(cell_data)
+
+
+def make_table(num_rows):
+    return {
+        'is_table': True,
+        'header': ['Employee ID', 'Name', 'Department', 'Score', 'Band'],
+        'rows': [
+            [f'EMP{i:06d}', f'Employee {i}', 'Engineering', f'{(i % 50) / 10:.1f}', f'L{i % 7}']
+            for i in range(num_rows)
+        ],
+    }
+
+
+def time_build(add_table, generator, table_data):
+    doc = Document()
+    start = time.perf_counter()
+    add_table(generator, doc, table_data)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[500, 1000, 2000, 4000, 8000, 16000])
+    parser.add_argument('--skip-legacy-above', type=int, default=8000,
+                        help='Only time the legacy builder up to this many rows')
+    args = parser.parse_args()
+
+    generator = DocumentGenerator()
+    bulk = lambda gen, doc, data: gen._add_table_to_word(doc, data)
+
+    print(f"{'rows':>8} {'legacy (s)':>12} {'growth':>8} {'bulk (s)':>10} {'growth':>8} {'speedup':>8}")
+    previous_legacy = previous_bulk = None
+    for num_rows in args.rows:
+        table_data = make_table(num_rows)
+
+        legacy = None
+        if num_rows <= args.skip_legacy_above:
+            legacy = time_build(legacy_add_table_to_word, generator, table_data)
+        bulk_time = time_build(bulk, generator, table_data)
+
+        legacy_growth = f'{legacy / previous_legacy:.1f}x' if legacy and previous_legacy else '-'
+        bulk_growth = f'{bulk_time / previous_bulk:.1f}x' if previous_bulk else '-'
+        legacy_text = f'{legacy:.3f}' if legacy is not None else 'skipped'
+        speedup = f'{legacy / bulk_time:.0f}x' if legacy else '-'
+        print(f'{num_rows:>8} {legacy_text:>12} {legacy_growth:>8} {bulk_time:>10.3f} {bulk_growth:>8} {speedup:>8}')
+
+        previous_legacy, previous_bulk = legacy, bulk_time
+
+
+if __name__ == '__main__':
+    main()
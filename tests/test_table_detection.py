@@ -0,0 +1,56 @@
+"""Regression tests for table detection in TextAnalyzer."""
+import logging
+import os
+import sys
+import warnings
+
+# Importing app outside `streamlit run` logs bare-mode warnings
+warnings.filterwarnings('ignore')
+logging.disable(logging.WARNING)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import TextAnalyzer
+
+
+def quoted_table(num_rows, stray_quote_row):
+    """A comma table with one quoted cell and one unbalanced quote"""
+    lines = ['Name,City,Score', '"Smith, John",NYC,1']
+    lines += [f'Person {i},Town {i},{i}' for i in range(num_rows - 1)]
+    lines[stray_quote_row] = f'Person {stray_quote_row},"Town {stray_quote_row},{stray_quote_row}'
+    return '\n'.join(lines)
+
+
+def test_unbalanced_quote_only_loses_its_own_row():
+    table = TextAnalyzer()._detect_table_structure(quoted_table(200, 5))
+
+    assert table['is_table']
+    assert table['separator'] == ','
+    assert table['num_rows'] == 199
+    assert table['rows'][0] == ['Smith, John', 'NYC', '1']
+
+
+def test_unbalanced_quote_does_not_hit_the_csv_field_limit():
+    # Swallowing the lines after the stray quote used to exceed csv's 128 KB field limit
+    table = TextAnalyzer()._detect_table_structure(quoted_table(20000, 5))
+
+    assert table['is_table']
+    assert table['num_rows'] == 19999
+
+
+def test_markdown_region_keeps_short_rows_and_escaped_pipes():
+    text = '\n'.join([
+        '| Fruit | Qty | Note |',
+        '|:------|----:|------|',
+        '| Apple | 5 | red |',
+        '| Pear | 10 |',
+        '| Kiwi \\| Gold | 7 | tart |',
+        '',
+        'Store,City,Open',
+        'North,Oslo,Yes',
+        'South,Rome,No',
+    ])
+    tables = TextAnalyzer()._detect_tables(text)
+
+    assert len(tables) == 2
+    assert tables[0]['alignments'] == ['left', 'right', None]
+    assert list(tables[0]['rows']) == [['Apple', '5', 'red'], ['Pear', '10', ''], ['Kiwi | Gold', '7', 'tart']]